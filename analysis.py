@@ -1,52 +1,114 @@
-import numpy as np
-import re
+from collections import Counter
 from tkinter import messagebox
 from analysis_window import launch_analysis_window
+from metrics_cache import METRICS_CACHE, metrics_key
+from test_loader import detect_test_type, test_identity
+from window_metrics import WindowMetrics
 
 
-def analyze_test_block(test):
-    raw = test['raw']
+# Windows (analysis or comparison) showing each test, by test identity
+_open_windows = Counter()
+
+
+def window_opened(test_key):
+    _open_windows[test_key] += 1
+
+
+def window_closed(test_key, test=None):
+    """
+    Once the last window showing a test is closed, drops its cached metrics and
+    the channels its TestRecord decoded, so memory does not grow with every test
+    opened during a session.
+    """
+    _open_windows[test_key] -= 1
+    if _open_windows[test_key] > 0:
+        return
+    del _open_windows[test_key]
+    METRICS_CACHE.discard(test_key)
+    if test is not None:
+        test.release()
+
+
+class TestBlockError(Exception):
+    """A test that cannot be analyzed; carries the title of the message box to show."""
+
+    def __init__(self, title, message, warning=False):
+        super().__init__(message)
+        self.title = title
+        self.warning = warning
+
+
+def prepare_test_block(test):
+    """
+    Everything the analysis window needs that does not touch Tk: samples, test type,
+    the window metrics precomputation and the (cache key, metrics) of the full
+    recording. Safe to run on a worker thread.
+    """
     tipo = test['tipo']
     fecha = test['fecha']
 
-    # Extract lines after <DecimalSeparator>
-    lines = raw.split('\n')
-    idx = next((i for i, line in enumerate(lines) if '<DecimalSeparator>' in line), None)
+    # Without a <DecimalSeparator> header the numeric section cannot be read
+    if test['dec_sep'] is None:
+        raise TestBlockError("Error", "<DecimalSeparator> not found or incomplete block.")
 
-    if idx is None or idx + 2 >= len(lines):
-        messagebox.showerror("Error", "<DecimalSeparator> not found or incomplete block.")
-        return
+    # Detect test type (before decoding, unsupported tests are not read)
+    s = detect_test_type(tipo)
+    if s is None:
+        raise TestBlockError("Not Implemented", f"Test type not supported: {tipo}", warning=True)
 
-    data_lines = [line.replace(',', '.') for line in lines[idx+2:] if line.strip()]
+    # Only time, eye and head are decoded, and not kept on the record here: a job
+    # superseded by a newer analysis must not leave them behind. The window that
+    # opens attaches them until it closes.
+    t, e, h = test.channels(keep=False)
 
-    data = []
-    for line in data_lines:
-        try:
-            nums = list(map(float, line.strip().split(';')))
-            if len(nums) == 9:
-                data.append(nums)
-        except ValueError:
-            continue  # skip invalid lines
-
-    if not data:
-        messagebox.showerror("Error", "No valid numeric data found in test block.")
-        return
+    if len(t) == 0:
+        raise TestBlockError("Error", "No valid numeric data found in test block.")
+
+    test_key = test_identity(test)
+    window_metrics = WindowMetrics(t, e, h, s)
+    # Computed here but cached by the caller on the Tk thread, which only sees
+    # current jobs: a superseded one must not leave its metrics in METRICS_CACHE
+    key = metrics_key(test_key, t[0], t[-1], s)
+    metrics = METRICS_CACHE.get(key) or window_metrics.metrics(t[0], t[-1])
+    label_info = f"{fecha} | {tipo}"
+    return t, e, h, s, label_info, test_key, window_metrics, (key, metrics)
 
-    data = np.array(data)
-    t_raw = data[:, 0]
-    t = (t_raw - t_raw[0]) / 10000000  # Convert to seconds
-    h = data[:, 1]
-    e = data[:, 2]
-
-    # Detect test type
-    tipo_lower = tipo.lower()
-    if 'vvor' in tipo_lower or 'rvvo' in tipo_lower:
-        s = 0
-    elif 'vors' in tipo_lower or 'srvo' in tipo_lower:
-        s = 1
+
+def show_test_error(exc):
+    if isinstance(exc, TestBlockError):
+        show = messagebox.showwarning if exc.warning else messagebox.showerror
+        show(exc.title, str(exc))
     else:
-        messagebox.showwarning("Not Implemented", f"Test type not supported: {tipo}")
-        return
+        messagebox.showerror("Error", f"{type(exc).__name__}: {exc}")
 
-    label_info = f"{fecha} | {tipo}"
-    launch_analysis_window(t, e, h, s, label_info)
+
+def analyze_test_block(test, runner=None, on_finished=None):
+    """
+    Opens the analysis window of a test. With a TaskRunner the data loading and
+    metrics run in the background and the window opens when they are ready;
+    on_finished() is called on the Tk thread either way.
+    """
+    def done(prepared):
+        if on_finished is not None:
+            on_finished()
+        t, e, h, s, label_info, test_key, window_metrics, (key, metrics) = prepared
+        window_opened(test_key)
+        METRICS_CACHE.put(key, metrics)
+        test.attach(t=t, e=e, h=h)
+        launch_analysis_window(t, e, h, s, label_info, test_key, window_metrics, runner,
+                               on_close=lambda: window_closed(test_key, test))
+
+    def failed(exc):
+        if on_finished is not None:
+            on_finished()
+        show_test_error(exc)
+
+    if runner is None:
+        try:
+            prepared = prepare_test_block(test)
+        except Exception as exc:
+            failed(exc)
+            return
+        done(prepared)
+        return
+    runner.submit('analysis', lambda: prepare_test_block(test), done, failed)
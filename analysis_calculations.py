@@ -1,40 +1,71 @@
 import numpy as np
-from scipy.signal import find_peaks
-from fft_utils import compute_fft
+from scipy.signal import find_peaks, peak_prominences, peak_widths
+from fft_utils import compute_ffts
+from cycles import cycle_stats, empty_table, half_cycle_table
+from desaccade import desaccade
+from profiling import stage
+from regression import fit_metrics, linear_fit, side_masks
 
-def pr_score_vvr(t, e, h, s):
+def half_cycle_saccades(e, h):
+    """
+    Splits the recording into half cycles at head-velocity zero crossings and finds
+    the first saccade of each one with a single peak search over the whole |e|.
+    A barrier sample higher than any eye velocity is inserted at every crossing, so
+    peaks, prominence bases and widths never reach into a neighbouring half cycle:
+    the result equals running find_peaks on every half cycle separately.
+    Returns: start, end, left-side flag, amplitude gate, first peak index (-1 if none)
+    """
+    sig_pos = h > 0
+    cros = sig_pos.astype(int) - np.roll(sig_pos.astype(int), 1)
+    cros_pos = np.where(cros != 0)[0]
+    starts = cros_pos[:-1]
+    ends = cros_pos[1:]
+    left = cros[starts] == 1
+    first_peak = np.full(len(starts), -1)
+    if len(starts) == 0:
+        return starts, ends, left, np.zeros(0, dtype=bool), first_peak
+
+    peak_head = np.maximum.reduceat(np.abs(h[cros_pos[0]:cros_pos[-1]]), starts - cros_pos[0])
+    valid = (ends - starts >= 4) & (peak_head >= 15)
+
+    # Same criteria as find_peaks(height=180, prominence=130, width=(None, 20)),
+    # applied in steps so the barriers are dropped before their prominence is computed
+    abs_e = np.abs(e)
+    barrier_pos = cros_pos + np.arange(len(cros_pos))
+    x = np.insert(abs_e, cros_pos, np.nanmax(abs_e) + 1)
+    peaks, _ = find_peaks(x, height=180)
+    peaks = peaks[~np.isin(peaks, barrier_pos)]
+    prominence_data = peak_prominences(x, peaks)
+    prominent = prominence_data[0] >= 130
+    peaks = peaks[prominent]
+    prominence_data = tuple(p[prominent] for p in prominence_data)
+    widths = peak_widths(x, peaks, rel_height=0.5, prominence_data=prominence_data)[0]
+    peaks = peaks[widths <= 20]
+    idx = peaks - np.searchsorted(barrier_pos, peaks)
+
+    seg = np.searchsorted(starts, idx, side='right') - 1
+    inside = (seg >= 0) & (idx < cros_pos[-1])
+    idx, seg = idx[inside], seg[inside]
+    gated = valid[seg]
+    idx, seg = idx[gated], seg[gated]
+    seg, first = np.unique(seg, return_index=True)
+    first_peak[seg] = idx[first]
+    return starts, ends, left, valid, first_peak
+
+def pr_score_vvr(t, e, h, s, segments=None):
     lPR = np.nan
     rPR = np.nan
     saccade_positions = []
     if s == 1 or len(t) < 4 or len(e) < 4 or len(h) < 4:
         return lPR, rPR, saccade_positions
-    sig_pos = h > 0
-    cros = sig_pos.astype(int) - np.roll(sig_pos.astype(int), 1)
-    cros_pos = np.where(cros != 0)[0]
-    latency_L = []
-    latency_R = []
-    for n in range(1, len(cros_pos)):
-        start = cros_pos[n - 1]
-        end = cros_pos[n]
-        h_int = h[start:end]
-        e_int = e[start:end]
-        t_int = t[start:end]
-        if len(e_int) < 4 or np.max(np.abs(h_int)) < 15:
-            continue
-        left = cros[start] == 1
-        peaks, _ = find_peaks(
-            np.abs(e_int),
-            height=180,
-            prominence=130,
-            width=(None, 20)
-        )
-        if len(peaks) > 0:
-            latency = t_int[peaks[0]] - t_int[0]
-            saccade_positions.append(t_int[peaks[0]])
-            if left:
-                latency_L.append(latency)
-            else:
-                latency_R.append(latency)
+    # segments: half_cycle_saccades(e, h) when the caller already has it
+    starts, _, left, _, first_peak = segments if segments is not None else half_cycle_saccades(e, h)
+    found = first_peak >= 0
+    peak_idx = first_peak[found]
+    latency = t[peak_idx] - t[starts[found]]
+    saccade_positions = list(t[peak_idx])
+    latency_L = latency[left[found]]
+    latency_R = latency[~left[found]]
     if len(latency_L) > 3 and np.mean(latency_L) != 0:
         lPR = round(np.std(latency_L) / np.mean(latency_L) * 100)
     if len(latency_R) > 3 and np.mean(latency_R) != 0:
@@ -43,37 +74,22 @@ def pr_score_vvr(t, e, h, s):
     rPR = min(rPR, 100) if not np.isnan(rPR) else rPR
     return lPR, rPR, saccade_positions
 
-def calculate_all_metrics(t, e, h, s):
+def spectral_metrics(h, e, dataHeadL, dataEyeL, dataHeadR, dataEyeR):
     """
-    Calculates and returns a dictionary with all the numerical metrics needed for plots and summary.
-    Safe for empty or too-short data.
+    SPI/SNR, dominant head frequency and Fourier gains of one analysis window,
+    plus the head and eye spectra used by the FFT plot.
     """
-    Fs = 250  # Hz
-    kernel = 35 if s else 30
-    desac_e = np.convolve(e, np.ones(kernel) / kernel, mode='same') if len(e) >= kernel else e.copy() if len(e) > 0 else np.array([])
-    pos_mask = h > 0
-    neg_mask = h < 0
-    dataEyeL = desac_e[pos_mask] if len(desac_e) == len(h) else np.array([])
-    dataHeadL = h[pos_mask]
-    dataEyeR = desac_e[neg_mask] if len(desac_e) == len(h) else np.array([])
-    dataHeadR = h[neg_mask]
-    # Gains (avoid zero division and empty arrays)
-    gain_auc_L = np.nan
-    gain_auc_R = np.nan
-    if len(dataHeadL) > 1 and np.abs(np.trapz(dataHeadL, dx=1/Fs)) > 0:
-        gain_auc_L = np.trapz(dataEyeL, dx=1/Fs) / np.trapz(dataHeadL, dx=1/Fs)
-    if len(dataHeadR) > 1 and np.abs(np.trapz(dataHeadR, dx=1/Fs)) > 0:
-        gain_auc_R = np.trapz(np.abs(dataEyeR), dx=1/Fs) / np.trapz(np.abs(dataHeadR), dx=1/Fs)
-    # FFTs and spectral metrics
-    fH, P1H, spi_h, snr_h = compute_fft(h) if len(h) > 1 else ([], [], np.nan, np.nan)
-    fE, P1E, spi_e, snr_e = compute_fft(e) if len(e) > 1 else ([], [], np.nan, np.nan)
+    # Head/eye, left and right pairs have equal lengths: three 2-D transforms in total
+    signals = [h, e, dataHeadL, dataEyeL, dataHeadR, dataEyeR]
+    empty = ([], [], np.nan, np.nan)
+    spectra = iter(compute_ffts([x for x in signals if len(x) > 1]))
+    head, eye, headL, eyeL, headR, eyeR = [next(spectra) if len(x) > 1 else empty for x in signals]
+    fH, P1H, spi_h, snr_h = head
+    fE, P1E, spi_e, snr_e = eye
+    P1HeadL, P1EyeL, P1HeadR, P1EyeR = headL[1], eyeL[1], headR[1], eyeR[1]
     ixx = np.argmax(P1H) if len(P1H) > 0 else 0
     maxFreqHeadFour = fH[ixx] if len(fH) > 0 and ixx < len(fH) else np.nan
     # Fourier Gain
-    fHeadL, P1HeadL, _, _ = compute_fft(dataHeadL) if len(dataHeadL) > 1 else ([], [], np.nan, np.nan)
-    fEyeL, P1EyeL, _, _ = compute_fft(dataEyeL) if len(dataEyeL) > 1 else ([], [], np.nan, np.nan)
-    fHeadR, P1HeadR, _, _ = compute_fft(dataHeadR) if len(dataHeadR) > 1 else ([], [], np.nan, np.nan)
-    fEyeR, P1EyeR, _, _ = compute_fft(dataEyeR) if len(dataEyeR) > 1 else ([], [], np.nan, np.nan)
     if len(P1HeadL) > 0:
         maxHeadPwrL = np.max(P1HeadL)
         idxL = np.argmax(P1HeadL)
@@ -88,42 +104,79 @@ def calculate_all_metrics(t, e, h, s):
         rightFouGain = maxEyeRPwr / maxHeadPwrR if maxHeadPwrR > 0 else np.nan
     else:
         rightFouGain = np.nan
+    return {
+        "leftFouGain": leftFouGain,
+        "rightFouGain": rightFouGain,
+        "spi_h": spi_h, "spi_e": spi_e,
+        "snr_h": snr_h, "snr_e": snr_e,
+        "maxFreqHeadFour": maxFreqHeadFour,
+        "fH": fH, "P1H": P1H, "fE": fE, "P1E": P1E
+    }
+
+def calculate_all_metrics(t, e, h, s):
+    """
+    Calculates and returns a dictionary with all the numerical metrics needed for plots and summary.
+    Safe for empty or too-short data. Float32 channels are computed in float64.
+    """
+    Fs = 250  # Hz
+    e, h = np.asarray(e, dtype=np.float64), np.asarray(h, dtype=np.float64)
+    n = len(h)
+    with stage('metrics.desaccade', n=n):
+        desac_e = desaccade(e, s)
+    with stage('metrics.masks', n=n):
+        pos_mask, neg_mask = side_masks(h)
+        dataEyeL = desac_e[pos_mask] if len(desac_e) == len(h) else np.array([])
+        dataHeadL = h[pos_mask]
+        dataEyeR = desac_e[neg_mask] if len(desac_e) == len(h) else np.array([])
+        dataHeadR = h[neg_mask]
+    # Gains (avoid zero division and empty arrays)
+    gain_auc_L = np.nan
+    gain_auc_R = np.nan
+    with stage('metrics.auc', left=len(dataHeadL), right=len(dataHeadR)):
+        if len(dataHeadL) > 1 and np.abs(np.trapz(dataHeadL, dx=1/Fs)) > 0:
+            gain_auc_L = np.trapz(dataEyeL, dx=1/Fs) / np.trapz(dataHeadL, dx=1/Fs)
+        if len(dataHeadR) > 1 and np.abs(np.trapz(dataHeadR, dx=1/Fs)) > 0:
+            gain_auc_R = np.trapz(np.abs(dataEyeR), dx=1/Fs) / np.trapz(np.abs(dataHeadR), dx=1/Fs)
+    # FFTs and spectral metrics
+    with stage('metrics.spectral', n=n, left=len(dataHeadL), right=len(dataHeadR)):
+        spectral = spectral_metrics(h, e, dataHeadL, dataEyeL, dataHeadR, dataEyeR)
     # Regression gains
-    posH = h[h > 0]
-    posE = desac_e[h > 0] if len(desac_e) == len(h) else np.array([])
-    negH = h[h < 0]
-    negE = desac_e[h < 0] if len(desac_e) == len(h) else np.array([])
-    m_pos = np.polyfit(posH, posE, 1)[0] if len(posH) > 1 and len(posE) > 1 else np.nan
-    m_neg = np.polyfit(negH, negE, 1)[0] if len(negH) > 1 and len(negE) > 1 else np.nan
+    with stage('metrics.regression', left=len(dataHeadL), right=len(dataHeadR)):
+        fits = fit_metrics(linear_fit(dataHeadL, dataEyeL), linear_fit(dataHeadR, dataEyeR))
+    # Half cycles: per-cycle gains, peaks and saccade latencies, then PR from the same segments
+    with stage('metrics.cycles', n=n):
+        segments = half_cycle_saccades(e, h) if n >= 4 and len(desac_e) == n else None
+        cycles = half_cycle_table(t, h, desac_e, segments) if segments is not None else empty_table()
     # PR, saccades
-    lPR, rPR, saccades = pr_score_vvr(t, e, h, s)
-    # Include FFT for plotting
+    with stage('metrics.pr_score', n=n):
+        lPR, rPR, saccades = pr_score_vvr(t, e, h, s, segments)
     # headVelocc mean data
     mean_peak_head = np.nan
     std_peak_head = np.nan
-    if len(h) > 3:
-        peaks_max, _ = find_peaks(h, height=30, prominence=10)
-        peaks_min, _ = find_peaks(-h, height=30, prominence=10)
-        all_peaks = np.concatenate((h[peaks_max], h[peaks_min]))
-        all_peaks = np.abs(all_peaks)  # ← Este paso es clave
-        if len(all_peaks) > 1:
-            mean_peak_head = np.mean(all_peaks)
-            std_peak_head = np.std(all_peaks)
+    with stage('metrics.head_peaks', n=n):
+        if len(h) > 3:
+            peaks_max, _ = find_peaks(h, height=30, prominence=10)
+            peaks_min, _ = find_peaks(-h, height=30, prominence=10)
+            all_peaks = np.concatenate((h[peaks_max], h[peaks_min]))
+            all_peaks = np.abs(all_peaks)  # ← Este paso es clave
+            if len(all_peaks) > 1:
+                mean_peak_head = np.mean(all_peaks)
+                std_peak_head = np.std(all_peaks)
     metrics = {
         "desac_e": desac_e,
         "gain_auc_L": gain_auc_L,
         "gain_auc_R": gain_auc_R,
-        "leftFouGain": leftFouGain,
-        "rightFouGain": rightFouGain,
-        "spi_h": spi_h, "spi_e": spi_e,
-        "snr_h": snr_h, "snr_e": snr_e,
-        "maxFreqHeadFour": maxFreqHeadFour,
-        "m_pos": m_pos, "m_neg": m_neg,
+        "pos_mask": pos_mask, "neg_mask": neg_mask,
         "lPR": lPR, "rPR": rPR,
         "saccades": saccades,
         "mean_peak_head": mean_peak_head,
         "std_peak_head": std_peak_head,
-        # For FFT plot
-        "fH": fH, "P1H": P1H, "fE": fE, "P1E": P1E
     }
+    # Regression gains with fit quality
+    metrics.update(fits)
+    # Half-cycle table and its per-side aggregates
+    metrics["cycles"] = cycles
+    metrics.update(cycle_stats(cycles))
+    # Spectral metrics, including the FFT for plotting
+    metrics.update(spectral)
     return metrics
\ No newline at end of file
@@ -1,9 +1,94 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from profiling import stage
+from regression import side_masks
 
-def update_all_plots(axs, t, e, h, s, metrics, plot4="Fourier Gain"):
+LOD_MIN_SAMPLES = 4000  # traces shorter than this are always drawn in full
+FFT_MAX_FREQ = 5  # Hz, upper limit of the FFT Spectrum plot
+
+def axis_pixels(ax, dpi=None):
+    """Width and height in pixels of an axis when rendered at dpi (default: the figure's)."""
+    fig = ax.figure
+    box = ax.get_position()
+    dpi = dpi or fig.dpi
+    return box.width * fig.get_figwidth() * dpi, box.height * fig.get_figheight() * dpi
+
+def lod_indices(ys, n_bins, keep=None):
+    """
+    Min/max envelope decimation: splits the samples into n_bins runs and keeps the
+    minimum and maximum of every signal in each run, plus the first and last sample
+    and any `keep` indices (e.g. saccade peaks). The polyline through the kept
+    samples covers the same pixels as the full trace at that resolution.
+    Returns sorted sample indices shared by all the signals.
+    """
+    n = len(ys[0])
+    n_bins = max(int(n_bins), 1)
+    if n <= max(LOD_MIN_SAMPLES, 4 * n_bins):
+        return np.arange(n)
+    size = -(-n // n_bins)
+    m = n // size * size
+    offsets = np.arange(0, m, size)
+    picks = [np.array([0, n - 1]), np.asarray(keep if keep is not None else [], dtype=np.intp)]
+    for y in ys:
+        y = np.asarray(y, dtype=float)
+        low = np.where(np.isnan(y), np.inf, y)
+        high = np.where(np.isnan(y), -np.inf, y)
+        picks.append(offsets + np.argmin(low[:m].reshape(-1, size), axis=1))
+        picks.append(offsets + np.argmax(high[:m].reshape(-1, size), axis=1))
+        if m < n:
+            picks.append(m + np.array([np.argmin(low[m:]), np.argmax(high[m:])]))
+    return np.unique(np.concatenate(picks))
+
+def trace_lod(ax, ys, dpi=None, keep=None):
+    """lod_indices at the resolution of the axis: one min/max pair per pixel column."""
+    return lod_indices(ys, axis_pixels(ax, dpi)[0], keep)
+
+def scatter_lod(ax, x, y, dpi=None):
+    """
+    Thins a dense scatter to one point per pixel cell of the axis, always keeping the
+    extreme points, so long recordings do not rasterise every sample.
+    Returns the indices of the points to draw.
+    """
+    n = len(x)
+    if n <= LOD_MIN_SAMPLES:
+        return np.arange(n)
+    ok = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if len(ok) == 0:
+        return ok
+    xs, ys = x[ok], y[ok]
+    width, height = axis_pixels(ax, dpi)
+    span_x = np.ptp(xs) or 1.0
+    span_y = np.ptp(ys) or 1.0
+    cx = ((xs - xs.min()) / span_x * width).astype(np.int64)
+    cy = ((ys - ys.min()) / span_y * height).astype(np.int64)
+    _, first = np.unique(cx * (int(height) + 2) + cy, return_index=True)
+    extremes = [np.argmin(xs), np.argmax(xs), np.argmin(ys), np.argmax(ys)]
+    return ok[np.unique(np.concatenate((first, extremes)))]
+
+def spectrum_lod(ax, f, P1, dpi=None):
+    """
+    Bins of a spectrum worth drawing in the 0–FFT_MAX_FREQ plot: the visible ones,
+    envelope-decimated to the axis width, plus the global peak so the y autoscale
+    stays as if every bin was drawn.
+    """
+    f, P1 = np.asarray(f), np.asarray(P1)
+    if len(f) == 0 or len(P1) == 0:
+        return np.zeros(0, dtype=np.intp)
+    visible = np.flatnonzero(f <= FFT_MAX_FREQ)
+    if len(visible) < len(f):
+        visible = np.append(visible, visible[-1] + 1 if len(visible) else 0)
+    picked = visible[trace_lod(ax, (P1[visible],), dpi)] if len(visible) else visible
+    return np.union1d(picked, [np.nanargmax(P1) if not np.all(np.isnan(P1)) else 0])
+
+def saccade_indices(t, saccades):
+    """Sample indices of the saccade peaks, kept by the decimation of the eye trace."""
+    if len(saccades) == 0 or len(t) == 0:
+        return np.zeros(0, dtype=np.intp)
+    return np.clip(np.searchsorted(t, saccades), 0, len(t) - 1)
+
+def update_all_plots(axs, t, e, h, s, metrics, plot4="Fourier Gain", lod_dpi=None):
     # Ajuste global de espaciado entre subplots
-    plt.subplots_adjust(hspace=0.4, wspace=0.3)
+    axs[0, 0].figure.subplots_adjust(hspace=0.4, wspace=0.3)
     plt.rcParams.update({'axes.edgecolor': '#555', 'axes.linewidth': 0.8})
 
     color_head = "#37474F"
@@ -21,9 +106,10 @@ def update_all_plots(axs, t, e, h, s, metrics, plot4="Fourier Gain"):
     # === Raw Data ===
     ax = axs[0, 0]
     ax.clear()
-    ax.plot(t, h, color=color_head, label='Head', linewidth=2.0, alpha=0.9)
-    ax.plot(t, e, color=color_eye, label='Eye', linewidth=1.2, alpha=0.65)
-    ax.fill_between(t, h, e, color="#FFE0B2", alpha=0.12)
+    i = trace_lod(ax, (h, e), lod_dpi)
+    ax.plot(t[i], h[i], color=color_head, label='Head', linewidth=2.0, alpha=0.9)
+    ax.plot(t[i], e[i], color=color_eye, label='Eye', linewidth=1.2, alpha=0.65)
+    ax.fill_between(t[i], h[i], e[i], color="#FFE0B2", alpha=0.12)
     ymin = np.min(h) - 50
     ymax = np.max(h) + 50
     ax.set_ylim(ymin, ymax)
@@ -40,9 +126,10 @@ def update_all_plots(axs, t, e, h, s, metrics, plot4="Fourier Gain"):
     ax = axs[0, 1]
     ax.clear()
     desac_e = metrics.get("desac_e", np.zeros_like(e))
-    ax.plot(t, h, color=color_head, label='Head', linewidth=2.0, alpha=0.9)
-    ax.plot(t, desac_e, color=color_eye, label='Desacc Eye', linewidth=1.2, alpha=0.65)
-    ax.fill_between(t, h, desac_e, color="#FFE0B2", alpha=0.12)
+    i = trace_lod(ax, (h, desac_e), lod_dpi)
+    ax.plot(t[i], h[i], color=color_head, label='Head', linewidth=2.0, alpha=0.9)
+    ax.plot(t[i], desac_e[i], color=color_eye, label='Desacc Eye', linewidth=1.2, alpha=0.65)
+    ax.fill_between(t[i], h[i], desac_e[i], color="#FFE0B2", alpha=0.12)
     ymin = np.min(h) - 50
     ymax = np.max(h) + 50
     ax.set_ylim(ymin, ymax)
@@ -64,14 +151,16 @@ def update_all_plots(axs, t, e, h, s, metrics, plot4="Fourier Gain"):
     P1E = metrics.get("P1E", [])
 
     if len(fH) > 0 and len(P1H) > 0:
-        ax.vlines(fH, 0, P1H, colors=color_head, linewidth=1.5, label='Head', zorder=1)
-        ax.scatter(fH, P1H, color=color_head, s=24, marker='o', zorder=2)
+        i = spectrum_lod(ax, fH, P1H, lod_dpi)
+        ax.vlines(fH[i], 0, P1H[i], colors=color_head, linewidth=1.5, label='Head', zorder=1)
+        ax.scatter(fH[i], P1H[i], color=color_head, s=24, marker='o', zorder=2)
 
     if len(fE) > 0 and len(P1E) > 0:
-        ax.vlines(fE, 0, P1E, colors=color_eye, linewidth=1.0, label='Eye', zorder=3)
-        ax.scatter(fE, P1E, color=color_eye, s=18, marker='^', zorder=4)
+        i = spectrum_lod(ax, fE, P1E, lod_dpi)
+        ax.vlines(fE[i], 0, P1E[i], colors=color_eye, linewidth=1.0, label='Eye', zorder=3)
+        ax.scatter(fE[i], P1E[i], color=color_eye, s=18, marker='^', zorder=4)
 
-    ax.set_xlim(0, 5)
+    ax.set_xlim(0, FFT_MAX_FREQ)
     ax.set_title(f"FFT Spectrum – Head Peak: {metrics.get('maxFreqHeadFour', 0):.2f} Hz", **font_title)
     ax.legend(loc='upper right', **font_legend)
     ax.tick_params(**font_tick)
@@ -101,26 +190,37 @@ def update_all_plots(axs, t, e, h, s, metrics, plot4="Fourier Gain"):
         for spine in ax.spines.values():
             spine.set_visible(False)
     elif plot4 == "Regression Gain":
-        plot_regression_gain(ax, t, e, h, s, metrics)
+        plot_regression_gain(ax, t, e, h, s, metrics, lod_dpi)
     elif plot4 == "Saccade Detection":
-        plot_saccade_detection(ax, t, e, h, s, metrics)
+        plot_saccade_detection(ax, t, e, h, s, metrics, lod_dpi)
+
+def side_data(h, desac_e, metrics):
+    """
+    (head, desaccaded eye) samples of the left and right sides, selected with the
+    masks stored in the metrics when they belong to this window.
+    """
+    pos_mask, neg_mask = metrics.get("pos_mask"), metrics.get("neg_mask")
+    if pos_mask is None or len(pos_mask) != len(h):
+        pos_mask, neg_mask = side_masks(h)
+    if len(desac_e) != len(h):
+        return (h[pos_mask], np.array([])), (h[neg_mask], np.array([]))
+    return (h[pos_mask], desac_e[pos_mask]), (h[neg_mask], desac_e[neg_mask])
 
-def plot_regression_gain(ax, t, e, h, s, metrics):
+def plot_regression_gain(ax, t, e, h, s, metrics, lod_dpi=None):
     color_left = "#1E88E5"
     color_right = "#E53935"
     color_ref_left = (0.2, 0.2, 0.2, 0.58)
     color_ref_right = (0, 0, 0, 0.95)
 
     desac_e = metrics.get("desac_e", np.zeros_like(e))
-    posH = h[h > 0]
-    posE = desac_e[h > 0] if len(desac_e) == len(h) else np.array([])
-    negH = h[h < 0]
-    negE = desac_e[h < 0] if len(desac_e) == len(h) else np.array([])
+    (posH, posE), (negH, negE) = side_data(h, desac_e, metrics)
     m_pos = metrics.get("m_pos", 0)
     m_neg = metrics.get("m_neg", 0)
 
-    ax.scatter(posH, posE, s=7, c=color_left, alpha=0.22, label='Left data', zorder=1)
-    ax.scatter(negH, negE, s=7, c=color_right, alpha=0.22, label='Right data', zorder=1)
+    iL = scatter_lod(ax, posH, posE, lod_dpi) if len(posE) == len(posH) else slice(None)
+    iR = scatter_lod(ax, negH, negE, lod_dpi) if len(negE) == len(negH) else slice(None)
+    ax.scatter(posH[iL], posE[iL], s=7, c=color_left, alpha=0.22, label='Left data', zorder=1)
+    ax.scatter(negH[iR], negE[iR], s=7, c=color_right, alpha=0.22, label='Right data', zorder=1)
 
     if len(posH) > 1:
         xL = np.linspace(np.min(posH), np.max(posH), 50)
@@ -138,7 +238,7 @@ def plot_regression_gain(ax, t, e, h, s, metrics):
     for spine in ax.spines.values():
         spine.set_visible(False)
 
-def plot_saccade_detection(ax, t, e, h, s, metrics):
+def plot_saccade_detection(ax, t, e, h, s, metrics, lod_dpi=None):
     color_head = "#37474F"
     color_eye = "#FF6F00"
     color_saccade = "#212121"
@@ -146,9 +246,10 @@ def plot_saccade_detection(ax, t, e, h, s, metrics):
     lPR = metrics.get("lPR", "-")
     rPR = metrics.get("rPR", "-")
 
-    ax.plot(t, h, color=color_head, label='Head', linewidth=2.0, alpha=0.9)
-    ax.plot(t, e, color=color_eye, label='Eye', linewidth=1.2, alpha=0.65)
     saccades = metrics.get("saccades", [])
+    i = trace_lod(ax, (h, e), lod_dpi, keep=saccade_indices(t, saccades))
+    ax.plot(t[i], h[i], color=color_head, label='Head', linewidth=2.0, alpha=0.9)
+    ax.plot(t[i], e[i], color=color_eye, label='Eye', linewidth=1.2, alpha=0.65)
     if len(saccades) > 0 and len(e) > 0 and len(t) > 0:
         sacades_y = np.interp(saccades, t, e)
         ax.scatter(saccades, sacades_y, s=28, c="none", edgecolors=color_saccade, linewidths=1.5, marker="o", label='Saccades')
@@ -163,10 +264,269 @@ def plot_saccade_detection(ax, t, e, h, s, metrics):
     for spine in ax.spines.values():
         spine.set_visible(False)
 
-def update_six_plots(axs, t, e, h, s, metrics):
-    update_all_plots(axs[:2, :], t, e, h, s, metrics, plot4="Fourier Gain")
-    plot_regression_gain(axs[2, 0], t, e, h, s, metrics)
+def update_six_plots(axs, t, e, h, s, metrics, lod_dpi=None, plot4="Fourier Gain"):
+    with stage('render.update_all_plots', n=len(t)):
+        update_all_plots(axs[:2, :], t, e, h, s, metrics, plot4=plot4, lod_dpi=lod_dpi)
+    with stage('render.regression_gain', n=len(t)):
+        plot_regression_gain(axs[2, 0], t, e, h, s, metrics, lod_dpi)
     axs[2, 0].set_ylabel("Eye Velocity (°/s)", fontsize=8)
-    plot_saccade_detection(axs[2, 1], t, e, h, s, metrics)
+    with stage('render.saccade_detection', n=len(t)):
+        plot_saccade_detection(axs[2, 1], t, e, h, s, metrics, lod_dpi)
     axs[2, 1].set_ylabel("Velocity (°/s)", fontsize=8)
     
+
+class LivePlots:
+    """
+    Persistent-artist renderer for the interactive 2x2 figure: the artists are created
+    on the first update and later window changes only push new data into them
+    (set_data/set_offsets/set_segments). Data cursors are animated artists blitted
+    over a background cached after every full draw, so placing them never redraws
+    the figure; nearest() reads them from the full-resolution samples behind each
+    decimated trace. update_all_plots stays the renderer of exported figures.
+    """
+
+    color_head = "#37474F"
+    color_eye = "#FF6F00"
+    color_left = "#1E88E5"
+    color_right = "#E53935"
+    color_ref_left = (0.2, 0.2, 0.2, 0.58)
+    color_ref_right = (0, 0, 0, 0.95)
+    color_saccade = "#212121"
+    font_title = {'fontsize': 10, 'fontweight': 'bold'}
+
+    def __init__(self, fig, axs, canvas):
+        self.fig = fig
+        self.axs = axs
+        self.canvas = canvas
+        self.artists = None
+        self.plot4 = None
+        self.plot4_artists = {}
+        self.overlays = []
+        self.sources = {}  # decimated line -> full-resolution (x, y) it was drawn from
+        self.background = None
+        fig.subplots_adjust(hspace=0.4, wspace=0.3)
+        plt.rcParams.update({'axes.edgecolor': '#555', 'axes.linewidth': 0.8})
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    # ---------- data ----------
+    def update(self, t, e, h, s, metrics, plot4="Fourier Gain"):
+        """Pushes a new window into the artists and redraws the figure once."""
+        with stage('render.live_update', n=len(t)):
+            self._push(t, e, h, s, metrics, plot4)
+
+    def _push(self, t, e, h, s, metrics, plot4):
+        self.clear_overlays(blit=False)
+        self.sources = {}
+        desac_e = metrics.get("desac_e", np.zeros_like(e))
+        if self.artists is None:
+            self._create(t, e, h, desac_e)
+        a = self.artists
+        ylim = (np.min(h) - 50, np.max(h) + 50)
+
+        # === Raw Data / Desaccaded Data ===
+        for ax, head, eye, band, eye_data in ((self.axs[0, 0], a['raw_h'], a['raw_e'], a['raw_fill'], e),
+                                              (self.axs[0, 1], a['des_h'], a['des_e'], a['des_fill'], desac_e)):
+            # Resolution follows the axis width and the selected window, so narrowing
+            # the window brings back the detail
+            i = trace_lod(ax, (h, eye_data))
+            head.set_data(t[i], h[i])
+            eye.set_data(t[i], eye_data[i])
+            self.sources[head], self.sources[eye] = (t, h), (t, eye_data)
+            band.set_data(t[i], h[i], eye_data[i])
+            ax.relim()
+            ax.autoscale_view(scaley=False)
+            ax.set_ylim(*ylim)
+        self.axs[0, 1].set_title(f"Desaccaded – AUC Gain: L={metrics.get('gain_auc_L', 0):.2f} R={metrics.get('gain_auc_R', 0):.2f}", **self.font_title)
+
+        # === FFT Spectrum ===
+        top = 0
+        for stems, dots, f, P1 in ((a['fft_h_stems'], a['fft_h_dots'], metrics.get("fH", []), metrics.get("P1H", [])),
+                                   (a['fft_e_stems'], a['fft_e_dots'], metrics.get("fE", []), metrics.get("P1E", []))):
+            f, P1 = np.asarray(f, dtype=float), np.asarray(P1, dtype=float)
+            if len(f) == 0 or len(P1) == 0:
+                f, P1 = np.empty(0), np.empty(0)
+            i = spectrum_lod(self.axs[1, 0], f, P1)
+            f, P1 = f[i], P1[i]
+            stems.set_segments(np.stack((np.column_stack((f, np.zeros_like(P1))), np.column_stack((f, P1))), axis=1))
+            dots.set_offsets(np.column_stack((f, P1)))
+            if len(P1):
+                top = max(top, np.nanmax(P1))
+        ax = self.axs[1, 0]
+        if top > 0:
+            ax.set_ylim(-0.05 * top, 1.05 * top)
+        ax.set_title(f"FFT Spectrum – Head Peak: {metrics.get('maxFreqHeadFour', 0):.2f} Hz", **self.font_title)
+
+        # === Fourth Plot ===
+        if plot4 != self.plot4:
+            self._create_plot4(plot4)
+        if plot4 == "Fourier Gain":
+            self._update_fourier_gain(metrics)
+        elif plot4 == "Regression Gain":
+            self._update_regression_gain(h, desac_e, metrics)
+        elif plot4 == "Saccade Detection":
+            self._update_saccade_detection(t, e, h, metrics)
+        with stage('render.canvas_draw', n=len(t)):
+            self.canvas.draw()
+
+    def _create(self, t, e, h, desac_e):
+        a = {}
+        for ax, key, title, eye_label, eye_data in ((self.axs[0, 0], 'raw', "Raw Data", 'Eye', e),
+                                                    (self.axs[0, 1], 'des', "Desaccaded", 'Desacc Eye', desac_e)):
+            ax.clear()
+            a[key + '_h'], = ax.plot(t, h, color=self.color_head, label='Head', linewidth=2.0, alpha=0.9)
+            a[key + '_e'], = ax.plot(t, eye_data, color=self.color_eye, label=eye_label, linewidth=1.2, alpha=0.65)
+            a[key + '_fill'] = ax.fill_between(t, h, eye_data, color="#FFE0B2", alpha=0.12)
+            ax.set_title(title, **self.font_title)
+            ax.legend(loc='upper right', fontsize=8)
+            ax.set_ylabel("Velocity (°/s)", fontsize=8)
+            self._style(ax)
+
+        ax = self.axs[1, 0]
+        ax.clear()
+        a['fft_h_stems'] = ax.vlines([], 0, [], colors=self.color_head, linewidth=1.5, label='Head', zorder=1)
+        a['fft_h_dots'] = ax.scatter([], [], color=self.color_head, s=24, marker='o', zorder=2)
+        a['fft_e_stems'] = ax.vlines([], 0, [], colors=self.color_eye, linewidth=1.0, label='Eye', zorder=3)
+        a['fft_e_dots'] = ax.scatter([], [], color=self.color_eye, s=18, marker='^', zorder=4)
+        ax.set_xlim(0, FFT_MAX_FREQ)
+        ax.legend(loc='upper right', fontsize=8)
+        ax.set_ylabel("Amplitude", fontsize=8)
+        self._style(ax)
+        self.artists = a
+
+    def _create_plot4(self, plot4):
+        ax = self.axs[1, 1]
+        ax.clear()
+        p = {}
+        if plot4 == "Fourier Gain":
+            p['left'] = ax.scatter([0], [0], s=160, c=[self.color_left], edgecolor="k", label="Left Gain", zorder=3)
+            p['right'] = ax.scatter([1], [0], s=160, c=[self.color_right], edgecolor="k", label="Right Gain", zorder=3)
+            ax.axhline(1, color="#888", linestyle="--", linewidth=2.1, zorder=4)
+            ax.set_ylim(0, 1.25)
+            ax.set_xlim(-0.5, 1.5)
+            ax.set_xticks([0, 1])
+            ax.set_xticklabels(["Left Gain", "Right Gain"])
+        elif plot4 == "Regression Gain":
+            p['left'] = ax.scatter([], [], s=7, c=self.color_left, alpha=0.22, label='Left data', zorder=1)
+            p['right'] = ax.scatter([], [], s=7, c=self.color_right, alpha=0.22, label='Right data', zorder=1)
+            p['ref_left'], = ax.plot([], [], '--', color=self.color_ref_left, lw=1.1, zorder=3, label="Expected Left")
+            p['fit_left'], = ax.plot([], [], color=self.color_left, lw=2.5, zorder=2, label="Left regression")
+            p['ref_right'], = ax.plot([], [], '--', color=self.color_ref_right, lw=1.3, zorder=3, label="Expected Right")
+            p['fit_right'], = ax.plot([], [], color=self.color_right, lw=2.5, zorder=2, label="Right regression")
+            ax.legend(loc='lower right', fontsize=8)
+        elif plot4 == "Saccade Detection":
+            p['head'], = ax.plot([], [], color=self.color_head, label='Head', linewidth=2.0, alpha=0.9)
+            p['eye'], = ax.plot([], [], color=self.color_eye, label='Eye', linewidth=1.2, alpha=0.65)
+            p['saccades'] = ax.scatter([], [], s=28, c="none", edgecolors=self.color_saccade, linewidths=1.5,
+                                       marker="o", label='Saccades')
+            ax.legend(loc='upper right', fontsize=8)
+        self._style(ax)
+        self.plot4 = plot4
+        self.plot4_artists = p
+
+    def _update_fourier_gain(self, metrics):
+        p = self.plot4_artists
+        leftFouGain = metrics.get("leftFouGain", 0)
+        rightFouGain = metrics.get("rightFouGain", 0)
+        p['left'].set_offsets([[0, leftFouGain]])
+        p['right'].set_offsets([[1, rightFouGain]])
+        self.axs[1, 1].set_title(f"Fourier Gain – L={leftFouGain:.2f} R={rightFouGain:.2f}", **self.font_title)
+
+    def _update_regression_gain(self, h, desac_e, metrics):
+        p = self.plot4_artists
+        ax = self.axs[1, 1]
+        m_pos = metrics.get("m_pos", 0)
+        m_neg = metrics.get("m_neg", 0)
+        ax.ignore_existing_data_limits = True
+        for side, (H, E), m in zip(('left', 'right'), side_data(h, desac_e, metrics), (m_pos, m_neg)):
+            if len(E) != len(H):
+                H = E = np.zeros(0)
+            points = np.column_stack((H, E))
+            p[side].set_offsets(points[scatter_lod(ax, H, E)])
+            if len(H) > 1:
+                x = np.linspace(np.min(H), np.max(H), 50)
+                p['ref_' + side].set_data(x, x)
+                p['fit_' + side].set_data(x, m * x)
+            else:
+                p['ref_' + side].set_data([], [])
+                p['fit_' + side].set_data([], [])
+            if len(points):
+                ax.update_datalim(points[np.all(np.isfinite(points), axis=1)])
+        for line in ('ref_left', 'fit_left', 'ref_right', 'fit_right'):
+            if len(p[line].get_xdata()):
+                ax.update_datalim(np.column_stack(p[line].get_data()))
+        ax.autoscale_view()
+        ax.set_title(f"Regression Gain – L={m_pos:.2f} R={m_neg:.2f}", fontsize=10, fontweight="bold")
+
+    def _update_saccade_detection(self, t, e, h, metrics):
+        p = self.plot4_artists
+        ax = self.axs[1, 1]
+        lPR = metrics.get("lPR", "-")
+        rPR = metrics.get("rPR", "-")
+        saccades = np.asarray(metrics.get("saccades", []), dtype=float)
+        i = trace_lod(ax, (h, e), keep=saccade_indices(t, saccades))
+        p['head'].set_data(t[i], h[i])
+        p['eye'].set_data(t[i], e[i])
+        self.sources[p['head']], self.sources[p['eye']] = (t, h), (t, e)
+        if len(saccades) > 0 and len(e) > 0 and len(t) > 0:
+            p['saccades'].set_offsets(np.column_stack((saccades, np.interp(saccades, t, e))))
+        else:
+            p['saccades'].set_offsets(np.empty((0, 2)))
+        ax.relim()
+        ax.autoscale_view(scaley=False)
+        ax.set_ylim(np.min(h) - 75, np.max(h) + 75)
+        ax.set_title(f"Saccade Detection – PR L={lPR if not np.isnan(lPR) else '-'} R={rPR if not np.isnan(rPR) else '-'}", fontsize=10, fontweight="bold")
+
+    @staticmethod
+    def _style(ax):
+        ax.tick_params(axis='both', which='major', labelsize=8)
+        ax.grid(True, linestyle='--', linewidth=0.5, alpha=0.6)
+        for spine in ax.spines.values():
+            spine.set_visible(False)
+
+    def nearest(self, line, x):
+        """
+        Point of `line` closest to x along the x axis. For a decimated trace it is the
+        nearest recorded sample, not the nearest of the min/max points drawn.
+        """
+        source = self.sources.get(line)
+        if source is None:
+            xs, ys = np.asarray(line.get_xdata(), dtype=float), np.asarray(line.get_ydata(), dtype=float)
+            i = np.abs(xs - x).argmin()
+            return xs[i], ys[i]
+        xs, ys = source
+        i = np.clip(np.searchsorted(xs, x), 1, len(xs) - 1)
+        i -= x - xs[i - 1] <= xs[i] - x  # the earlier sample on ties, as argmin
+        return xs[i], ys[i]
+
+    # ---------- blitted overlays ----------
+    def add_overlay(self, *artists):
+        """Shows animated artists (data cursors) without redrawing the figure."""
+        for artist in artists:
+            artist.set_animated(True)
+            self.overlays.append(artist)
+        self.blit()
+
+    def clear_overlays(self, blit=True):
+        for artist in self.overlays:
+            try: artist.remove()
+            except Exception: pass
+        self.overlays.clear()
+        if blit:
+            self.blit()
+
+    def blit(self):
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_overlays()
+        self.canvas.blit(self.fig.bbox)
+
+    def _draw_overlays(self):
+        for artist in self.overlays:
+            self.fig.draw_artist(artist)
+
+    def _on_draw(self, event):
+        # Every full draw (data change, resize) refreshes the cached background
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_overlays()
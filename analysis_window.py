@@ -1,9 +1,12 @@
 import tkinter as tk
-from tkinter import Toplevel, Button, filedialog, StringVar, OptionMenu
+from tkinter import Toplevel, Button, filedialog, StringVar, OptionMenu, messagebox, ttk
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from analysis_calculations import calculate_all_metrics
-from analysis_plots import update_all_plots, update_six_plots
+from window_metrics import WindowMetrics
+from metrics_cache import METRICS_CACHE, metrics_key
+from analysis_plots import LivePlots
+from report_renderer import ReportRenderer
+from profiling import PROFILER
 import numpy as np
 import sys
 import os
@@ -13,7 +16,7 @@ def resource_path(relative_path):
     base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
     return os.path.join(base_path, relative_path)
 
-def launch_analysis_window(t, e, h, s, label_info):
+def launch_analysis_window(t, e, h, s, label_info, test_key=None, window_metrics=None, runner=None, on_close=None):
     win = Toplevel()
     win.title(f"VOR Analysis — {label_info}")
     win.geometry("1700x950")
@@ -67,6 +70,11 @@ def launch_analysis_window(t, e, h, s, label_info):
     cursor_btn.pack(anchor='center', fill=tk.X, pady=2)
     clear_cursor_btn = Button(btn_frame, text="🧹 Clear Data Cursors", font=('Arial', 11), padx=5, pady=3, width=13)
     clear_cursor_btn.pack(anchor='center', fill=tk.X, pady=2)
+    if PROFILER.enabled:
+        profile_btn = Button(btn_frame, text="⏱ Profile", font=('Arial', 11), padx=5, pady=3, width=13)
+        profile_btn.pack(anchor='center', fill=tk.X, pady=2)
+    # Shown while the metrics of a new window selection are computed in the background
+    progress = ttk.Progressbar(btn_frame, mode='indeterminate', length=120)
 
     # ========== PLOTS (2x2 grid, full width below header) ==========
     plot_frame = tk.Frame(win, bg="#242426")
@@ -76,29 +84,41 @@ def launch_analysis_window(t, e, h, s, label_info):
     canvas = FigureCanvasTkAgg(fig, master=plot_frame)
     canvas.draw()
     canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    live_plots = LivePlots(fig, axs, canvas)
 
     summary_text = ""
     data_cursor_active = [False]
-    all_annotations = []
-    all_markers = []
 
     # Variables for window selection
     tmin_original = t[0]
     tmax_original = t[-1]
     tmin = [tmin_original]
     tmax = [tmax_original]
+    # Cumulative statistics of the whole recording, so window changes only redo the spectra
+    if window_metrics is None:
+        window_metrics = WindowMetrics(t, e, h, s)
+    if test_key is None:
+        test_key = label_info
+    plots_channel = ('plots', str(win))
+
+    def window_results(lo, hi):
+        # Cached per window, so plot switches and figure export reuse the numbers
+        key = metrics_key(test_key, lo, hi, s)
+        return METRICS_CACHE.get_or_compute(key, lambda: window_metrics.metrics(lo, hi))
+
+    def current_metrics():
+        return window_results(tmin[0], tmax[0])
+
+    def show_progress(active):
+        if active:
+            progress.pack(anchor='center', pady=(8, 0))
+            progress.start(15)
+        else:
+            progress.stop()
+            progress.pack_forget()
 
     def remove_all_cursors():
-        nonlocal all_annotations, all_markers
-        for annotation in all_annotations:
-            try: annotation.remove()
-            except Exception: pass
-        all_annotations.clear()
-        for marker in all_markers:
-            try: marker.remove()
-            except Exception: pass
-        all_markers.clear()
-        canvas.draw()
+        live_plots.clear_overlays()
 
     def enable_data_cursor():
         if not data_cursor_active[0]:
@@ -120,74 +140,98 @@ def launch_analysis_window(t, e, h, s, label_info):
         closest_x, closest_y = None, None
         min_dist = float('inf')
         for line in lines:
-            xdata = line.get_xdata()
-            ydata = line.get_ydata()
-            idx = (np.abs(xdata - x_clicked)).argmin()
-            dist = abs(xdata[idx] - x_clicked)
+            # Traces are drawn decimated: the readout comes from the full-resolution samples
+            x, y = live_plots.nearest(line, x_clicked)
+            dist = abs(x - x_clicked)
             if dist < min_dist:
                 min_dist = dist
-                closest_x, closest_y = xdata[idx], ydata[idx]
+                closest_x, closest_y = x, y
         annotation = ax.annotate(f"x={closest_x:.2f}\ny={closest_y:.2f}",
                                 xy=(closest_x, closest_y), xytext=(10, 10),
                                 textcoords='offset points',
                                 bbox=dict(boxstyle="round,pad=0.2", fc="yellow", alpha=0.7),
-                                fontsize=11, color='black')
-        marker, = ax.plot(closest_x, closest_y, marker='x', markersize=13, color='#1976D2', markeredgewidth=2)
-        all_annotations.append(annotation)
-        all_markers.append(marker)
-        canvas.draw()
+                                fontsize=11, color='black', animated=True)
+        marker, = ax.plot(closest_x, closest_y, marker='x', markersize=13, color='#1976D2', markeredgewidth=2,
+                          animated=True)
+        # Blitted over the cached figure, no full redraw per cursor
+        live_plots.add_overlay(annotation, marker)
 
     def save_figure():
         path = filedialog.asksaveasfilename(defaultextension=".png",
-                                        filetypes=[("PNG Image", "*.png")])
-        if path:
-            # Aplicar mismo filtro que en update_plots()
-            idx = (t >= tmin[0]) & (t <= tmax[0])
-            t_window = t[idx]
-            e_window = e[idx]
-            h_window = h[idx]
-            
-            metrics = calculate_all_metrics(t_window, e_window, h_window, s)
-            # New figure for all 6 plots (3x2)
-            savefig, saveaxs = plt.subplots(3, 2, figsize=(16.5, 13))
-            savefig.subplots_adjust(hspace=0.38, wspace=0.22, top=0.90, bottom=0.12)
-            update_all_plots(saveaxs, t_window, e_window, h_window, s, metrics, plot4=plot_selector_var.get())
-            from analysis_plots import plot_regression_gain, plot_saccade_detection
-            plot_regression_gain(saveaxs[2,0], t_window, e_window, h_window, s, metrics)
-            plot_saccade_detection(saveaxs[2,1], t_window, e_window, h_window, s, metrics)
-
-            if not np.isnan(metrics['maxFreqHeadFour']):
-                freq_str = f"Dominant Head Freq: {metrics['maxFreqHeadFour']:.2f} Hz\n"
-            else:
-                freq_str = "Dominant Head Freq: - Hz\n"
-            summary = (
-                f"Time window: {t_window[0]:.2f}–{t_window[-1]:.2f} s (Δt = {t_window[-1]-t_window[0]:.2f} s)\n"
-                f"Max Head Vel: {np.nanmax(np.abs(h_window)):.2f} °/s | "
-                f"Max Eye Vel: {np.nanmax(np.abs(metrics['desac_e'])):.2f} °/s\n"
-                f"Mean Peak Head Vel: {metrics['mean_peak_head']:.2f} ± {metrics['std_peak_head']:.2f} °/s\n"
-                f"{freq_str}"
-                f"SPI Head: {metrics['spi_h']:.2f} | Eye: {metrics['spi_e']:.2f}   SNR Head: {metrics['snr_h']:.1f} dB | Eye: {metrics['snr_e']:.1f} dB\n"
-                f"Gain (slope) L: {metrics['m_pos']:.2f} | R: {metrics['m_neg']:.2f}   "
-                f"AUC Gain L: {metrics['gain_auc_L']:.2f} | R: {metrics['gain_auc_R']:.2f}   "
-                f"Fourier Gain L: {metrics['leftFouGain']:.2f} | R: {metrics['rightFouGain']:.2f}\n"
-                f"PR Score: L = {metrics['lPR']} | R = {metrics['rPR']}"
-            )
-        savefig.text(0.5, 0.005, summary, ha='center', fontsize=12, color="#222", wrap=True)
-        savefig.savefig(path, dpi=300)
-        plt.close(savefig)
+                                        filetypes=[("PNG Image", "*.png"), ("PDF Document", "*.pdf")])
+        if not path:
+            return
+        # Aplicar mismo filtro que en update_plots()
+        idx = (t >= tmin[0]) & (t <= tmax[0])
+        renderer = ReportRenderer()
+        renderer.draw(t[idx], e[idx], h[idx], s, current_metrics(), plot4=plot_selector_var.get(), title=label_info)
+        renderer.save(path)
+
+    def show_profile():
+        # Debug panel: per-stage timings collected since startup or the last clear
+        panel = Toplevel(win)
+        panel.title("Profile — stage timings")
+        panel.geometry("900x420")
+        text = tk.Text(panel, font=("Consolas", 10), wrap=tk.NONE)
+        buttons = tk.Frame(panel)
+        buttons.pack(side=tk.BOTTOM, fill=tk.X)
+        text.pack(fill=tk.BOTH, expand=True)
+
+        def refresh():
+            text.config(state=tk.NORMAL)
+            text.delete('1.0', tk.END)
+            text.insert(tk.END, PROFILER.format_summary())
+            text.config(state=tk.DISABLED)
+
+        def clear():
+            PROFILER.clear()
+            refresh()
+
+        def export():
+            out = filedialog.asksaveasfilename(parent=panel, defaultextension=".json",
+                                               filetypes=[("JSON records", "*.json"),
+                                                          ("Chrome trace", "*.trace.json")])
+            if out:
+                PROFILER.export(out)
+
+        for label, command in (("Refresh", refresh), ("Clear", clear), ("Export…", export)):
+            Button(buttons, text=label, font=('Arial', 10), command=command).pack(side=tk.LEFT, padx=4, pady=4)
+        refresh()
 
     def update_plots(*args):
+        # Metrics of a new selection are computed on the worker; rapid clicks coalesce
+        # into the latest one. Drawing always happens here, on the Tk thread.
+        lo, hi = tmin[0], tmax[0]
+        if runner is None or METRICS_CACHE.get(metrics_key(test_key, lo, hi, s)) is not None:
+            if runner is not None:
+                runner.cancel(plots_channel)
+            show_progress(False)
+            draw_plots(lo, hi, window_results(lo, hi))
+            return
+
+        def on_metrics(metrics):
+            # Cached here rather than on the worker: a superseded job, or one still
+            # running when the window closed, never gets here
+            METRICS_CACHE.put(metrics_key(test_key, lo, hi, s), metrics)
+            show_progress(False)
+            draw_plots(lo, hi, metrics)
+
+        show_progress(True)
+        runner.submit(plots_channel, lambda: window_metrics.metrics(lo, hi), on_metrics, on_metrics_error)
+
+    def on_metrics_error(exc):
+        show_progress(False)
+        messagebox.showerror("Error", f"{type(exc).__name__}: {exc}", parent=win)
+
+    def draw_plots(lo, hi, metrics):
         nonlocal summary_text
         # Restore selected time window (restore to full range if needed)
-        idx = (t >= tmin[0]) & (t <= tmax[0])
-        t_window = t[idx]
-        e_window = e[idx]
-        h_window = h[idx]
-        for ax in axs.flatten():
-            ax.clear()
-        metrics = calculate_all_metrics(t_window, e_window, h_window, s)
-        update_all_plots(axs, t_window, e_window, h_window, s, metrics, plot4=plot_selector_var.get())
-        canvas.draw()
+        # t is sorted, so the window is a slice: views, which the plots keep for the data cursor
+        i0, i1 = window_metrics.bounds(lo, hi)
+        t_window = t[i0:i1]
+        e_window = e[i0:i1]
+        h_window = h[i0:i1]
+        live_plots.update(t_window, e_window, h_window, s, metrics, plot4=plot_selector_var.get())
         if not np.isnan(metrics['maxFreqHeadFour']):
             freq_str = f"Dominant Head Freq: {metrics['maxFreqHeadFour']:.2f} Hz\n"
         else:
@@ -233,6 +277,22 @@ def launch_analysis_window(t, e, h, s, label_info):
     save_btn.config(command=save_figure)
     cursor_btn.config(command=enable_data_cursor)
     clear_cursor_btn.config(command=remove_all_cursors)
-    plot_selector_var.trace_add('write', lambda *args: update_plots())
+    if PROFILER.enabled:
+        profile_btn.config(command=show_profile)
+    selector_trace = plot_selector_var.trace_add('write', lambda *args: update_plots())
+
+    def on_destroy(event):
+        if event.widget is not win:
+            return
+        if runner is not None:
+            runner.cancel(plots_channel)
+        # The selector variable lives in the root interpreter and pyplot keeps every
+        # figure it created: both would hold this window's arrays after it is gone
+        plot_selector_var.trace_remove('write', selector_trace)
+        plt.close(fig)
+        if on_close is not None:
+            on_close()
+
+    win.bind('<Destroy>', on_destroy)
 
     update_plots()
\ No newline at end of file
@@ -0,0 +1,191 @@
+# Headless batch analysis: one row of metrics per test, no Tk required
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from analysis_calculations import calculate_all_metrics
+from cycles import COLUMNS as CYCLE_COLUMNS, table_rows
+from profiling import PROFILER, collect, profiling_to
+from test_loader import iter_export_tests, detect_test_type
+
+HEADER_FIELDS = ['file', 'uid', 'guid', 'tipo', 'fecha']
+METRIC_FIELDS = [
+    'test_type', 'samples', 'rejected_rows', 'duration_s',
+    'gain_auc_L', 'gain_auc_R', 'm_pos', 'm_neg', 'leftFouGain', 'rightFouGain',
+    'r2_pos', 'r2_neg', 'm_pos_ci', 'm_neg_ci', 'b_pos', 'b_neg',
+    'spi_h', 'spi_e', 'snr_h', 'snr_e', 'maxFreqHeadFour',
+    'lPR', 'rPR', 'n_saccades',
+    'max_head_vel', 'mean_peak_head', 'std_peak_head',
+    'n_cycles_L', 'n_cycles_R', 'cycle_gain_L', 'cycle_gain_R', 'cycle_gain_L_iqr', 'cycle_gain_R_iqr',
+    'cycle_latency_L', 'cycle_latency_R', 'cycle_freq',
+]
+FIELDS = HEADER_FIELDS + METRIC_FIELDS + ['error']
+DEFAULT_CHUNKSIZE = 4
+_SCALARS = ('gain_auc_L', 'gain_auc_R', 'm_pos', 'm_neg', 'leftFouGain', 'rightFouGain',
+            'r2_pos', 'r2_neg', 'm_pos_ci', 'm_neg_ci', 'b_pos', 'b_neg',
+            'spi_h', 'spi_e', 'snr_h', 'snr_e', 'maxFreqHeadFour', 'lPR', 'rPR',
+            'mean_peak_head', 'std_peak_head',
+            'cycle_gain_L', 'cycle_gain_R', 'cycle_gain_L_iqr', 'cycle_gain_R_iqr',
+            'cycle_latency_L', 'cycle_latency_R', 'cycle_freq')
+CYCLE_FIELDS = ['file', 'uid', 'cycle'] + list(CYCLE_COLUMNS)
+# Errors of tests that can never be analyzed as they are (checked before any metric);
+# any other error comes from an exception during the analysis and may not recur
+NO_DECIMAL_SEPARATOR = "<DecimalSeparator> not found or incomplete block."
+UNSUPPORTED_TYPE = "Test type not supported: "
+NO_NUMERIC_DATA = "No valid numeric data found in test block."
+VALIDATION_ERRORS = (NO_DECIMAL_SEPARATOR, UNSUPPORTED_TYPE, NO_NUMERIC_DATA)
+
+
+def _header_row(test):
+    row = {key: test.get(key) for key in HEADER_FIELDS if key != 'file'}
+    row['file'] = os.path.basename(test['path'])
+    row['error'] = ''
+    return row
+
+
+def analyze_test(test, cycles=False):
+    """
+    Runs the same checks and metrics as the analysis window for one test.
+    Returns a row dict; problems are reported in its 'error' field. With cycles=True
+    the row also carries the half-cycle table as a list of dicts under 'cycles'.
+    """
+    row = _header_row(test)
+    if test['dec_sep'] is None:
+        row['error'] = NO_DECIMAL_SEPARATOR
+        return row
+    s = detect_test_type(test['tipo'])
+    if s is None:
+        row['error'] = UNSUPPORTED_TYPE + str(test['tipo'])
+        return row
+    t, e, h = test.channels(keep=False)
+    row['rejected_rows'] = test.get('rejected', 0)
+    if len(t) == 0:
+        row['error'] = NO_NUMERIC_DATA
+        return row
+
+    # Not through METRICS_CACHE: a batch never reads a test twice, and each pool
+    # worker would otherwise keep up to the cache's size of unused arrays
+    metrics = calculate_all_metrics(t, e, h, s)
+    row['test_type'] = 'VORS' if s else 'VVOR'
+    row['samples'] = len(t)
+    row['duration_s'] = float(t[-1] - t[0])
+    for key in _SCALARS:
+        row[key] = float(metrics[key])
+    row['n_saccades'] = len(metrics['saccades'])
+    row['max_head_vel'] = float(np.nanmax(np.abs(h)))
+    row['n_cycles_L'] = metrics['n_cycles_L']
+    row['n_cycles_R'] = metrics['n_cycles_R']
+    if cycles:
+        row['cycles'] = table_rows(metrics['cycles'])
+    return row
+
+
+def is_transient_error(error):
+    """True for the error of a row whose analysis raised, which a new attempt may not repeat."""
+    return bool(error) and not error.startswith(VALIDATION_ERRORS)
+
+
+def safe_analyze_test(test, cycles=False):
+    """analyze_test that turns any exception into an error row instead of aborting the batch."""
+    try:
+        return analyze_test(test, cycles)
+    except Exception as exc:
+        row = _header_row(test)
+        row['error'] = f"{type(exc).__name__}: {exc}"
+        return row
+
+
+def run_batch(tests, workers=None, chunksize=DEFAULT_CHUNKSIZE, cycles=False, mp_context=None):
+    """
+    Computes the metrics rows of `tests` on a process pool and yields them in
+    input order as soon as each one is ready. Workers receive only the test
+    dicts (path and byte offsets) and read their own samples from disk.
+    workers=1 runs everything in the calling process. Closing the generator
+    early cancels the tests not started yet instead of waiting for them.
+    mp_context is the multiprocessing context of the pool (e.g. spawn, from a GUI).
+    """
+    analyze = partial(safe_analyze_test, cycles=cycles)
+    if workers == 1:
+        for test in tests:
+            yield analyze(test)
+        return
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp_context)
+    try:
+        if not PROFILER.enabled:
+            yield from pool.map(analyze, tests, chunksize=chunksize)
+            return
+        # Worker stage timings travel back with each row
+        for row, records in pool.map(partial(collect, analyze), tests, chunksize=chunksize):
+            PROFILER.merge(records)
+            yield row
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def iter_batch_rows(paths, workers=None, chunksize=DEFAULT_CHUNKSIZE, cycles=False):
+    tests = (test for path in paths for test in iter_export_tests(path))
+    for row in run_batch(tests, workers, chunksize, cycles):
+        if row['error']:
+            print(f"{row['file']} [{row['uid']}]: {row['error']}", file=sys.stderr)
+        yield row
+
+
+def split_cycles(rows, output):
+    """Writes the half cycles of every row to the CSV `output` and yields the rows without them."""
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CYCLE_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            for i, cycle in enumerate(row.pop('cycles', [])):
+                writer.writerow(dict(cycle, file=row['file'], uid=row['uid'], cycle=i))
+            yield row
+
+
+def write_csv(rows, output):
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+
+
+def write_parquet(rows, output):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        sys.exit("Parquet output requires pyarrow (pip install pyarrow); use a .csv output instead.")
+    rows = list(rows)
+    table = pa.table({key: [row.get(key) for row in rows] for key in FIELDS})
+    pq.write_table(table, output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute VVOR/VORS metrics for every test in one or more exports.")
+    parser.add_argument('exports', nargs='+', help="export .txt files or .vvb binary caches")
+    parser.add_argument('-o', '--output', required=True, help="output .csv or .parquet file")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="worker processes (default: one per CPU, 1 = no pool)")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help="tests sent to a worker at a time")
+    parser.add_argument('--cycles', metavar='PATH',
+                        help="also write one CSV row per half cycle (gain, peaks, latency, frequency) to PATH")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="write per-stage timings to PATH (.trace.json for a Chrome trace)")
+    args = parser.parse_args(argv)
+
+    with profiling_to(args.profile):
+        rows = iter_batch_rows(args.exports, args.workers, args.chunksize, cycles=bool(args.cycles))
+        if args.cycles:
+            rows = split_cycles(rows, args.cycles)
+        if args.output.lower().endswith('.parquet'):
+            write_parquet(rows, args.output)
+        else:
+            write_csv(rows, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# Benchmark: np.convolve desaccade vs running-sum, chunked and saccade-aware filters
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from desaccade import DesaccadeFilter, desaccade, desaccade_kernel, filter_signal, running_mean
+
+Fs = 250
+CHUNK = 250  # one second of samples per call in the chunked mode
+
+
+def synthetic_eye(seconds, seed=0):
+    """Sinusoidal compensatory eye velocity with noise and catch-up saccade spikes."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * Fs)) / Fs
+    e = -135 * np.sin(2 * np.pi * 0.8 * t) + rng.normal(0, 8, len(t))
+    for start in rng.integers(0, len(t) - 10, int(seconds)):
+        e[start:start + 8] += 250 * np.hanning(8)
+    return e
+
+
+def chunked(e, kernel, method):
+    f = DesaccadeFilter(kernel, method)
+    parts = [f.process(e[i:i + CHUNK]) for i in range(0, len(e), CHUNK)]
+    return np.concatenate(parts + [f.flush()])
+
+
+def main(repeat=5):
+    kernel = desaccade_kernel(0)
+    cases = [
+        ('np.convolve (batch)', lambda e: desaccade(e, 0)),
+        ('running sum', lambda e: running_mean(e, kernel)),
+        ('running sum, 1 s chunks', lambda e: chunked(e, kernel, 'mean')),
+        ('median', lambda e: filter_signal(e, kernel, 'median')),
+        ('threshold', lambda e: filter_signal(e, kernel, 'threshold')),
+    ]
+    print(f"{'seconds':>8} " + " ".join(f"{name:>24}" for name, _ in cases) + "   (ms)")
+    for seconds in (30, 300, 1200, 3600):
+        e = synthetic_eye(seconds)
+        reference = desaccade(e, 0)
+        assert np.allclose(running_mean(e, kernel), reference, rtol=0, atol=1e-9)
+        assert np.allclose(chunked(e, kernel, 'mean'), reference, rtol=0, atol=1e-9)
+        number = max(1, int(600 / seconds))
+        times = [min(timeit.repeat(lambda: fn(e), number=number, repeat=repeat)) / number for _, fn in cases]
+        print(f"{seconds:>8} " + " ".join(f"{1e3 * t:>24.2f}" for t in times))
+
+
+if __name__ == '__main__':
+    main()
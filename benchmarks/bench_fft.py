@@ -0,0 +1,53 @@
+# Benchmark: per-signal complex FFT vs the batched real-FFT spectral engine
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fft_utils import compute_ffts, amplitude_spectra
+
+Fs = 250
+
+
+def legacy_fft(data):
+    """compute_fft as it was before the real-FFT engine."""
+    L = len(data)
+    P2 = np.abs(np.fft.fft(data) / L)
+    P1 = P2[:L//2 + 1]
+    if L > 2:
+        P1[1:-1] = 2 * P1[1:-1]
+    f = Fs * np.arange(0, L//2 + 1) / L
+    max_val = np.max(P1)
+    spi = max_val / np.sum(P1) if np.sum(P1) != 0 else 0
+    noise_power = np.sum(P1) - max_val
+    snr = 10 * np.log10(max_val / noise_power) if noise_power > 0 else 0
+    return f, P1, spi, snr
+
+
+def window_signals(seconds, seed=0):
+    """The six signals spectral_metrics transforms for one synthetic recording."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * Fs)) / Fs
+    h = 150 * np.sin(2 * np.pi * 0.8 * t) + rng.normal(0, 5, len(t))
+    e = -0.9 * h + rng.normal(0, 8, len(t))
+    return [h, e, h[h > 0], e[h > 0], h[h < 0], e[h < 0]]
+
+
+def main(repeat=5):
+    print(f"{'seconds':>8} {'samples':>9} {'legacy ms':>10} {'batched ms':>11} {'padded ms':>10} {'speedup':>8}")
+    for seconds in (30, 120, 600, 1800, 3600):
+        signals = window_signals(seconds)
+        number = max(1, int(3600 / seconds))
+        legacy = min(timeit.repeat(lambda: [legacy_fft(x) for x in signals], number=number, repeat=repeat)) / number
+        batched = min(timeit.repeat(lambda: compute_ffts(signals), number=number, repeat=repeat)) / number
+        padded = min(timeit.repeat(lambda: [amplitude_spectra(x, Fs, pad=True) for x in signals],
+                                   number=number, repeat=repeat)) / number
+        for old, new in zip(map(legacy_fft, signals), compute_ffts(signals)):
+            assert np.allclose(old[1], new[1]) and np.isclose(old[2], new[2]) and np.isclose(old[3], new[3])
+        print(f"{seconds:>8} {len(signals[0]):>9} {legacy * 1e3:>10.2f} {batched * 1e3:>11.2f} "
+              f"{padded * 1e3:>10.2f} {legacy / batched:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+# Benchmark harness for the analysis pipeline, with JSON results for regression comparison
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import matplotlib
+matplotlib.use('Agg')
+import scipy
+from analysis_calculations import calculate_all_metrics, pr_score_vvr, spectral_metrics
+from block_decoder import decode_numeric_block
+from desaccade import desaccade
+from export_index import INDEX_SUFFIX, load_tests
+from export_parser import iter_tests, read_test_data
+from regression import linear_fit
+from report_renderer import ReportRenderer
+from test_loader import iter_export_tests
+from window_metrics import WindowMetrics
+from synthetic_export import write_export
+
+DURATIONS = (10, 60, 300, 1800)  # seconds per test for the per-test stages
+COUNTS = (1, 10, 100, 1000, 10000)  # tests per file for the parsing stages
+COUNT_TEST_S = 1.0  # duration of each test in the many-tests files
+QUICK_DURATIONS = (10, 60)
+QUICK_COUNTS = (1, 100)
+REGRESSION_THRESHOLD = 1.2  # a stage this many times slower than the baseline is a regression
+EXAMPLE_EXPORT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'example_data.txt')
+DECODE_TARGET = 10  # speed-up over the row parser asked of decode_numeric_block
+
+
+def best_time(fn, repeat=3, min_time=0.2):
+    """Best seconds per call over `repeat` rounds, each long enough to time reliably."""
+    elapsed = timeit.timeit(fn, number=1)
+    number = max(1, int(min_time / max(elapsed, 1e-6)))
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def _stage_metrics(t, e, h, s):
+    """The stages of calculate_all_metrics, each as a separate callable."""
+    desac_e = desaccade(e, s)
+    pos, neg = h > 0, h < 0
+    return {
+        'metrics.desaccade': lambda: desaccade(e, s),
+        'metrics.spectral': lambda: spectral_metrics(h, e, h[pos], desac_e[pos], h[neg], desac_e[neg]),
+        'metrics.pr_score': lambda: pr_score_vvr(t, e, h, s),
+        'metrics.regression': lambda: (linear_fit(h[pos], desac_e[pos]), linear_fit(h[neg], desac_e[neg])),
+        'metrics.calculate_all_metrics': lambda: calculate_all_metrics(t, e, h, s),
+        'window.precompute': lambda: WindowMetrics(t, e, h, s),
+    }
+
+
+def row_parser(raw):
+    """The per-line float loop that decode_numeric_block replaced, as the decode reference."""
+    data_lines = [line.replace(',', '.') for line in raw.decode('utf-8', errors='replace').split('\n') if line.strip()]
+    data = []
+    for line in data_lines:
+        try:
+            nums = list(map(float, line.strip().split(';')))
+            if len(nums) == 9:
+                data.append(nums)
+        except ValueError:
+            continue
+    return np.array(data)
+
+
+def bench_decode(test, size, repeat):
+    """
+    Times decode_numeric_block against the row parser on the same raw rows (all
+    nine columns) and records the speed-up on the decode.block result.
+    """
+    raw = read_test_data(test)
+    block = best_time(lambda: decode_numeric_block(raw, test['list_sep'], test['dec_sep']), repeat)
+    rows = best_time(lambda: row_parser(raw), repeat)
+    samples = len(decode_numeric_block(raw, test['list_sep'], test['dec_sep'])[0])
+    speedup = rows / block
+    print(f"{'decode.block':32} {size:>8} {1e3 * block:12.2f} ms", file=sys.stderr)
+    print(f"{'decode.row_parser':32} {size:>8} {1e3 * rows:12.2f} ms  "
+          f"({speedup:.1f}x faster, target {DECODE_TARGET}x)", file=sys.stderr)
+    return [{'stage': 'decode.block', 'size': size, 'samples': samples, 'seconds': block,
+             'speedup_vs_row_parser': speedup},
+            {'stage': 'decode.row_parser', 'size': size, 'samples': samples, 'seconds': rows}]
+
+
+def bench_example(repeat):
+    """The decode comparison on the bundled export, the file the decode target refers to."""
+    if not os.path.exists(EXAMPLE_EXPORT):
+        return []
+    return bench_decode(next(iter_tests(EXAMPLE_EXPORT)), 'example', repeat)
+
+
+def bench_durations(durations, workdir, repeat, render):
+    results = []
+    for seconds in durations:
+        path = os.path.join(workdir, f"duration_{seconds}s.txt")
+        write_export(path, n_tests=1, duration_s=seconds)
+        test = next(iter_export_tests(path))
+        t, e, h = test.channels(keep=False)
+        stages = {'decode': lambda: test.channels(keep=False)}
+        stages.update(_stage_metrics(t, e, h, 0))
+        window = WindowMetrics(t, e, h, 0)
+        mid = t[-1] / 2
+        stages['window.query'] = lambda: window.metrics(mid / 2, mid + mid / 2)
+        if render:
+            renderer = ReportRenderer(dpi=100)
+            metrics = calculate_all_metrics(t, e, h, 0)
+
+            def render_png():
+                renderer.draw(t, e, h, 0, metrics)
+                renderer.save(io.BytesIO())
+            stages['render.report_png'] = render_png
+        for name, fn in stages.items():
+            seconds_per_call = best_time(fn, repeat)
+            results.append({'stage': name, 'size': f"{seconds}s", 'samples': len(t), 'seconds': seconds_per_call})
+            print(f"{name:32} {seconds:>6} s {1e3 * seconds_per_call:12.2f} ms", file=sys.stderr)
+        results += bench_decode(test, f"{seconds}s", repeat)
+        os.remove(path)
+    return results
+
+
+def bench_counts(counts, workdir, repeat):
+    results = []
+    for count in counts:
+        path = os.path.join(workdir, f"count_{count}.txt")
+        write_export(path, n_tests=count, duration_s=COUNT_TEST_S)
+
+        def decode_all():
+            for test in iter_export_tests(path):
+                test.channels(keep=False)
+        stages = {
+            'parse.scan': lambda: list(iter_tests(path)),
+            'parse.indexed': lambda: load_tests(path),
+            'decode.all_tests': decode_all,
+        }
+        load_tests(path)  # writes the sidecar index read by parse.indexed
+        for name, fn in stages.items():
+            seconds_per_call = best_time(fn, repeat)
+            results.append({'stage': name, 'size': f"{count} tests", 'bytes': os.path.getsize(path),
+                            'seconds': seconds_per_call})
+            print(f"{name:32} {count:>6} t {1e3 * seconds_per_call:12.2f} ms", file=sys.stderr)
+        for leftover in (path, path + INDEX_SUFFIX):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'matplotlib': matplotlib.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Prints the ratio to the baseline of every stage; returns the regressions."""
+    previous = {(r['stage'], r['size']): r['seconds'] for r in baseline['results']}
+    regressions = []
+    for r in results:
+        key = (r['stage'], r['size'])
+        if key not in previous:
+            continue
+        ratio = r['seconds'] / previous[key]
+        flag = ''
+        if ratio > threshold:
+            flag = '  <-- slower'
+            regressions.append((key, ratio))
+        elif ratio < 1 / threshold:
+            flag = '  faster'
+        print(f"{r['stage']:32} {r['size']:>12} {ratio:8.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time parsing, decoding, metrics and rendering on synthetic exports.")
+    parser.add_argument('-o', '--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', metavar='BASELINE', help="JSON results of an earlier run to compare with")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="slowdown ratio reported as a regression")
+    parser.add_argument('--durations', type=lambda v: [int(x) for x in v.split(',')], default=DURATIONS,
+                        help="comma-separated test durations in whole seconds")
+    parser.add_argument('--counts', type=lambda v: [int(x) for x in v.split(',')], default=COUNTS,
+                        help="comma-separated numbers of tests per file")
+    parser.add_argument('--quick', action='store_true', help="small sizes only, for a fast check")
+    parser.add_argument('--no-render', action='store_true', help="skip the plot rendering stages")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+    durations = QUICK_DURATIONS if args.quick else args.durations
+    counts = QUICK_COUNTS if args.quick else args.counts
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = bench_example(args.repeat)
+        results += bench_durations(durations, workdir, args.repeat, not args.no_render)
+        results += bench_counts(counts, workdir, args.repeat)
+    report = {'environment': environment(), 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# Synthetic VVOR/VORS recordings written in the text export format
+import argparse
+import io
+import os
+import uuid
+import numpy as np
+
+Fs = 250  # Hz
+TICKS_PER_SAMPLE = 10000000 // Fs  # export timestamps are in 100 ns ticks
+COLUMNS_LINE = "<Time><LateralHead><EyeVelHR><HeadPosW><HeadPosX><HeadPosY><HeadPosZ><AbsEyePosXR><AbsEyePosYR>"
+TEST_TYPES = {0: "RVVO — Horizontal", 1: "SRVO — Horizontal"}
+ROW_FORMAT = "%d;%.12g;%.12g;%d;%d;%d;%d;%.8f;%.8f"
+
+
+def synthetic_recording(duration_s=30, head_freq=1.0, gain=0.93, saccade_rate=1.0, noise=8.0,
+                        amplitude=140.0, lead_in_s=2.0, seed=0):
+    """
+    Samples of one test in the 9-column export layout (time in ticks, head and eye
+    velocity in °/s, head quaternion, eye position).
+    - head: sinusoid of `amplitude` °/s at `head_freq` Hz after `lead_in_s` still seconds
+    - eye: `gain` times the head velocity plus white `noise` (°/s standard deviation)
+    - saccades: `saccade_rate` catch-up saccades per second on average, at most one per
+      head half cycle, 8 samples long and ~250 °/s in the direction of the head
+    """
+    rng = np.random.default_rng(seed)
+    n = max(int(round(duration_s * Fs)), 1)
+    t = np.arange(n) / Fs
+    moving = t >= lead_in_s
+    h = np.where(moving, amplitude * np.sin(2 * np.pi * head_freq * (t - lead_in_s)), 0.0)
+    h += rng.normal(0, 0.5, n)
+    e = gain * h + rng.normal(0, noise, n)
+
+    half_cycle = 0.5 / head_freq
+    p_saccade = min(1.0, saccade_rate * half_cycle)
+    spike = 250 * np.hanning(10)[1:-1]
+    for start in np.arange(lead_in_s, t[-1], half_cycle):
+        if rng.random() >= p_saccade:
+            continue
+        latency = np.clip(rng.normal(0.45, 0.12), 0.1, 0.9) * half_cycle
+        i = int((start + latency) * Fs)
+        if i + len(spike) >= n:
+            break
+        e[i:i + len(spike)] += np.sign(h[i] or 1) * spike
+
+    data = np.empty((n, 9))
+    data[:, 0] = 1043851317 + np.arange(n) * TICKS_PER_SAMPLE
+    data[:, 1] = h
+    data[:, 2] = e
+    data[:, 3:7] = (1, 0, 0, 0)
+    data[:, 7] = 142.7 + np.cumsum(rng.normal(0, 0.02, n))
+    data[:, 8] = 141.4 + np.cumsum(rng.normal(0, 0.02, n))
+    return data
+
+
+def test_guid(s, seed, duration_s, **params):
+    """
+    TestGUID of a synthetic test, derived from everything its samples depend on:
+    the same recording always gets the same GUID, and different ones never share it.
+    """
+    key = repr((s, seed, float(duration_s), sorted(params.items())))
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, 'vvor-synthetic:' + key))
+
+
+def format_test(data, uid, s=0, date="17.10.2024 15:58:33", guid=None):
+    """One test block: header line, column line and ';'/','-separated rows."""
+    guid = guid or str(uuid.uuid4())
+    header = (f"<TestUID>{uid}</TestUID><TestGUID>{guid}</TestGUID><TypeID>{3 + s}</TypeID>"
+              f"<TestType>{TEST_TYPES[s]}</TestType><VisionDenied>False</VisionDenied>"
+              f"<StartDateTime>{date}</StartDateTime><ListSeparator>;</ListSeparator>"
+              f"<DecimalSeparator>,</DecimalSeparator>")
+    rows = io.StringIO()
+    np.savetxt(rows, data, fmt=ROW_FORMAT)
+    return f"{header}\n{COLUMNS_LINE}\n{rows.getvalue().replace('.', ',')}"
+
+
+def write_export(path, n_tests=1, duration_s=30, vors=False, seed=0, **params):
+    """
+    Writes an export with n_tests synthetic tests; test i uses seed + i, so files are
+    reproducible, and its TestGUID follows from its type, seed and parameters (see
+    test_guid). Extra keyword arguments go to synthetic_recording.
+    Returns the number of bytes written.
+    """
+    s = int(vors)
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        for i in range(n_tests):
+            data = synthetic_recording(duration_s, seed=seed + i, **params)
+            f.write(format_test(data, uid=1000 + i, s=s, guid=test_guid(s, seed + i, duration_s, **params)))
+    return os.path.getsize(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic VVOR/VORS export file.")
+    parser.add_argument('output')
+    parser.add_argument('-n', '--tests', type=int, default=1, help="number of tests")
+    parser.add_argument('-d', '--duration', type=float, default=30, help="seconds per test")
+    parser.add_argument('--freq', type=float, default=1.0, help="head frequency in Hz")
+    parser.add_argument('--gain', type=float, default=0.93, help="VOR gain")
+    parser.add_argument('--saccades', type=float, default=1.0, help="catch-up saccades per second")
+    parser.add_argument('--noise', type=float, default=8.0, help="eye velocity noise in °/s")
+    parser.add_argument('--vors', action='store_true', help="write VORS instead of VVOR tests")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    size = write_export(args.output, args.tests, args.duration, args.vors, args.seed, head_freq=args.freq,
+                        gain=args.gain, saccade_rate=args.saccades, noise=args.noise)
+    print(f"{args.output}: {args.tests} test(s), {size / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# Memory-mappable binary container for decoded test recordings
+import json
+import os
+import struct
+import sys
+import numpy as np
+from block_decoder import N_COLS, decode_numeric_block
+from export_index import iter_indexed_tests
+from export_parser import read_test_data
+from test_record import TestRecord
+
+CACHE_SUFFIX = '.vvb'
+MAGIC = b'VVORBIN1'
+DATA_OFFSET = 64  # samples start on a 64-byte boundary
+DTYPE = np.dtype('<f8')
+COLUMNS = ('Time', 'LateralHead', 'EyeVelHR', 'HeadPosW', 'HeadPosX', 'HeadPosY',
+           'HeadPosZ', 'AbsEyePosXR', 'AbsEyePosYR')
+_TRAILER = struct.Struct('<QQ8s')  # table offset, table length, magic
+_HEADER_KEYS = ('uid', 'guid', 'tipo', 'fecha', 'list_sep', 'dec_sep')
+
+# Layout: MAGIC | padding | per-test (9, rows) float64 blocks | JSON table | trailer.
+# Each test block is column-major, so every channel of a test is one contiguous run.
+
+
+def is_cache_file(filepath):
+    try:
+        with open(filepath, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def convert_export(export_path, cache_path=None):
+    """
+    Decodes every test of a text export once and writes them to a binary container.
+    Returns the path of the container.
+    """
+    cache_path = cache_path or os.path.splitext(export_path)[0] + CACHE_SUFFIX
+    table = []
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC.ljust(DATA_OFFSET, b'\0'))
+        for test in iter_indexed_tests(export_path):
+            data, rejected = decode_numeric_block(read_test_data(test), test['list_sep'], test['dec_sep'])
+            entry = {key: test[key] for key in _HEADER_KEYS}
+            entry.update(offset=f.tell(), rows=len(data), rejected=rejected)
+            f.write(np.ascontiguousarray(data.T, dtype=DTYPE).tobytes())
+            table.append(entry)
+        table_offset = f.tell()
+        payload = json.dumps({'columns': COLUMNS, 'dtype': DTYPE.str, 'tests': table}).encode('utf-8')
+        f.write(payload)
+        f.write(_TRAILER.pack(table_offset, len(payload), MAGIC))
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+def load_cached_tests(cache_path):
+    """Reads the header table of a container; each TestRecord points at its sample block."""
+    with open(cache_path, 'rb') as f:
+        f.seek(-_TRAILER.size, os.SEEK_END)
+        table_offset, table_length, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a VVOR binary cache: {cache_path}")
+        f.seek(table_offset)
+        table = json.loads(f.read(table_length).decode('utf-8'))
+    return [TestRecord(**entry, path=cache_path, cached=True) for entry in table['tests']]
+
+
+def read_cached_data(test):
+    """Returns an (n, 9) read-only view of one test's samples, mapped straight from disk."""
+    if test['rows'] == 0:
+        return np.empty((0, N_COLS), dtype=DTYPE)
+    block = np.memmap(test['path'], dtype=DTYPE, mode='r',
+                      offset=test['offset'], shape=(N_COLS, test['rows']))
+    return block.T
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3):
+        print(f"Usage: python {os.path.basename(__file__)} EXPORT.txt [OUTPUT{CACHE_SUFFIX}]")
+        sys.exit(2)
+    print(convert_export(*sys.argv[1:]))
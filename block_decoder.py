@@ -0,0 +1,60 @@
+# Bulk decoding of the numeric rows of a test block
+import io
+import numpy as np
+
+N_COLS = 9  # Time, LateralHead, EyeVelHR, HeadPosW..Z, AbsEyePosXR, AbsEyePosYR
+
+
+def _decode_rows(text, list_sep, n_cols, dtype):
+    """Slow path: per-row decoding that skips malformed rows like the original loop."""
+    rows = []
+    rejected = 0
+    for line in text.split('\n'):
+        if not line.strip():
+            continue
+        try:
+            nums = list(map(float, line.strip().split(list_sep)))
+        except ValueError:
+            rejected += 1
+            continue
+        if len(nums) == n_cols:
+            rows.append(nums)
+        else:
+            rejected += 1
+    return np.array(rows, dtype=dtype).reshape(-1, n_cols), rejected
+
+
+def decode_numeric_block(data, list_sep=';', dec_sep=',', n_cols=N_COLS, dtype=np.float64, usecols=None):
+    """
+    Decodes the numeric rows of a test block into an (n, n_cols) array, honouring
+    the block's <ListSeparator> and <DecimalSeparator>. The whole section goes
+    through NumPy's C text reader in one pass; only if it contains malformed rows
+    is it re-read row by row, skipping blank lines and rejecting rows with a
+    wrong field count or a non-numeric field.
+    usecols: indices of the only columns to return (the text reader then skips
+    converting the others); rows are still checked for n_cols fields.
+    Returns: data array, number of rejected rows
+    """
+    if isinstance(data, bytes):
+        data = data.decode('utf-8', errors='replace')
+    list_sep = list_sep or ';'
+    if dec_sep and dec_sep != '.':
+        data = data.replace(dec_sep, '.')
+    if not data.strip():
+        return np.empty((0, n_cols if usecols is None else len(usecols)), dtype=dtype), 0
+
+    # Reading the last column as well makes short rows fail; long ones show in the
+    # separator count, as together the rows then hold more than n_cols fields each
+    read = None if usecols is None else sorted(set(usecols) | {n_cols - 1})
+    try:
+        values = np.loadtxt(io.StringIO(data), delimiter=list_sep, dtype=dtype,
+                            comments=None, ndmin=2, usecols=read)
+    except ValueError:
+        values = None
+    if values is not None:
+        if usecols is None and values.shape[1] == n_cols:
+            return values, 0
+        if usecols is not None and data.count(list_sep) == len(values) * (n_cols - 1):
+            return values[:, [read.index(c) for c in usecols]], 0
+    values, rejected = _decode_rows(data, list_sep, n_cols, dtype)
+    return (values if usecols is None else values[:, list(usecols)]), rejected
@@ -0,0 +1,202 @@
+# Several tests side by side: one pass over their metrics and overlays on shared axes
+import numpy as np
+from analysis_plots import FFT_MAX_FREQ, spectrum_lod, trace_lod
+from profiling import stage
+from regression import side_masks
+from report_renderer import load_test_metrics
+from test_loader import test_identity
+
+COLORS = ('#1E88E5', '#E53935', '#43A047', '#FB8C00', '#8E24AA', '#00ACC1', '#6D4C41', '#546E7A',
+          '#D81B60', '#C0CA33')
+# Columns of the comparison table: key, title, format
+TABLE_COLUMNS = (
+    ('label', 'Test', '{}'),
+    ('test_type', 'Type', '{}'),
+    ('gain_auc_L', 'AUC L', '{:.2f}'),
+    ('gain_auc_R', 'AUC R', '{:.2f}'),
+    ('m_pos', 'Slope L', '{:.2f}'),
+    ('m_neg', 'Slope R', '{:.2f}'),
+    ('leftFouGain', 'Fourier L', '{:.2f}'),
+    ('rightFouGain', 'Fourier R', '{:.2f}'),
+    ('lPR', 'PR L', '{}'),
+    ('rPR', 'PR R', '{}'),
+)
+
+
+def test_label(test):
+    return f"{test['uid']} · {test['fecha']}"
+
+
+def load_entry(test):
+    """
+    What the comparison keeps of one test: time, head velocity, type and the
+    full-recording metrics (shared with the analysis windows through METRICS_CACHE,
+    which also holds the desaccaded eye trace), released by
+    analysis.window_closed when the window closes.
+    """
+    t, _, h, s, metrics = load_test_metrics(test)
+    return {'key': test_identity(test), 'label': test_label(test), 'test': test,
+            't': t, 'h': h, 's': s, 'metrics': metrics}
+
+
+def load_entries(tests, known=(), progress=None):
+    """
+    One pass over `tests` that skips those whose identity is in `known`, so adding a
+    test to a comparison only loads that test. Each entry (or, for a test that cannot
+    be analyzed, {'key', 'label', 'error'}) is passed to progress() as soon as it is
+    ready. Returns the list of entries.
+    """
+    entries, seen = [], set(known)
+    with stage('compare.load', tests=len(tests)) as timing:
+        for test in tests:
+            key = test_identity(test)
+            if key in seen:
+                continue
+            seen.add(key)
+            try:
+                entry = load_entry(test)
+            except Exception as exc:
+                entry = {'key': key, 'label': test_label(test), 'error': f"{type(exc).__name__}: {exc}"}
+            entries.append(entry)
+            if progress is not None:
+                progress(entry)
+        timing.set(loaded=len(entries))
+    return entries
+
+
+def table_row(entry):
+    """Display values of one entry, in TABLE_COLUMNS order."""
+    m = entry['metrics']
+    values = dict(m, label=entry['label'], test_type='VORS' if entry['s'] else 'VVOR')
+    return tuple(fmt.format(values[key]) for key, _, fmt in TABLE_COLUMNS)
+
+
+class ComparisonPlots:
+    """
+    2x2 overlay figure: desaccaded eye velocity over time, eye (solid) and head
+    (dotted) spectra, left/right regression lines against the ideal gain, and the AUC
+    gains per test. Every test owns its artists, so adding or removing a test draws
+    or removes only its own lines; the gain panel is rebuilt as it is a few points.
+    """
+
+    font_title = {'fontsize': 10, 'fontweight': 'bold'}
+    color_ref = (0.2, 0.2, 0.2, 0.58)
+
+    def __init__(self, fig, axs, lod_dpi=None):
+        self.fig = fig
+        self.axs = axs
+        self.lod_dpi = lod_dpi
+        self.artists = {}  # entry key -> artists
+        self.order = []  # entry keys, in the order the tests were added
+        self.labels = {}
+        self.gains = {}  # entry key -> (AUC L, AUC R)
+        self._reference = None
+        self._setup()
+
+    def _setup(self):
+        a = self.axs
+        titles = ((a[0, 0], "Desaccaded Eye Velocity", "Time (s)", "Velocity (°/s)"),
+                  (a[0, 1], "FFT Spectrum – eye (solid), head (dotted)", "Frequency (Hz)", "Amplitude"),
+                  (a[1, 0], "Regression Gain", "Head Velocity (°/s)", "Eye Velocity (°/s)"),
+                  (a[1, 1], "AUC Gain", "", "Gain"))
+        for ax, title, xlabel, ylabel in titles:
+            ax.set_title(title, **self.font_title)
+            ax.set_xlabel(xlabel, fontsize=8)
+            ax.set_ylabel(ylabel, fontsize=8)
+            ax.tick_params(axis='both', which='major', labelsize=8)
+            ax.grid(True, linestyle='--', linewidth=0.5, alpha=0.6)
+            for spine in ax.spines.values():
+                spine.set_visible(False)
+        a[0, 1].set_xlim(0, FFT_MAX_FREQ)
+
+    def color(self, key):
+        return COLORS[self.order.index(key) % len(COLORS)]
+
+    def add(self, entry):
+        key = entry['key']
+        if key in self.artists or 'error' in entry:
+            return
+        self.order.append(key)
+        self.labels[key] = entry['label']
+        color = self.color(key)
+        with stage('render.compare_add', n=len(entry['t'])):
+            self.artists[key] = self._draw(entry, color)
+            m = entry['metrics']
+            self.gains[key] = (m['gain_auc_L'], m['gain_auc_R'])
+            self._finish()
+
+    def remove(self, key):
+        for artist in self.artists.pop(key, ()):
+            artist.remove()
+        if key in self.order:
+            self.order.remove(key)
+            self.labels.pop(key)
+            self.gains.pop(key)
+        # Colours follow the order of the remaining tests
+        for k in self.order:
+            for artist in self.artists[k]:
+                artist.set_color(self.color(k))
+        self._finish()
+
+    def _draw(self, entry, color):
+        a, dpi = self.axs, self.lod_dpi
+        t, h, m = entry['t'], entry['h'], entry['metrics']
+        desac_e = m['desac_e']
+        artists = []
+        i = trace_lod(a[0, 0], (desac_e,), dpi)
+        artists += a[0, 0].plot(t[i], desac_e[i], color=color, lw=0.8, alpha=0.8, label=entry['label'])
+
+        for f, P1, style, lw in ((m['fE'], m['P1E'], '-', 1.3), (m['fH'], m['P1H'], ':', 1.0)):
+            if len(f) > 0 and len(P1) > 0:
+                i = spectrum_lod(a[0, 1], f, P1, dpi)
+                artists += a[0, 1].plot(np.asarray(f)[i], np.asarray(P1)[i], style, color=color, lw=lw)
+
+        pos_mask, neg_mask = m.get('pos_mask'), m.get('neg_mask')
+        if pos_mask is None or len(pos_mask) != len(h):
+            pos_mask, neg_mask = side_masks(h)
+        for mask, slope in ((pos_mask, m['m_pos']), (neg_mask, m['m_neg'])):
+            head = h[mask]
+            if len(head) > 1 and np.isfinite(slope):
+                x = np.array([np.min(head), np.max(head)])
+                artists += a[1, 0].plot(x, slope * x, color=color, lw=2.0)
+        return artists
+
+    def _finish(self):
+        a = self.axs
+        # The ideal gain line spans every test's head velocity range
+        if self._reference is not None:
+            self._reference.remove()
+            self._reference = None
+        ax = a[1, 0]
+        ax.relim()
+        ax.autoscale_view()
+        if self.order:
+            lo, hi = ax.dataLim.intervalx
+            self._reference, = ax.plot([lo, hi], [lo, hi], '--', color=self.color_ref, lw=1.1, label='Gain 1')
+        for ax in (a[0, 0], a[0, 1]):
+            ax.relim()
+            ax.autoscale_view()
+        a[0, 1].set_xlim(0, FFT_MAX_FREQ)
+        legend = a[0, 0].get_legend()
+        if legend is not None:
+            legend.remove()
+        if self.order:
+            a[0, 0].legend(loc='upper right', fontsize=7)
+        self._draw_gains()
+
+    def _draw_gains(self):
+        ax = self.axs[1, 1]
+        for artist in list(ax.lines) + list(ax.collections):
+            artist.remove()
+        x = np.arange(len(self.order))
+        for side, offset, marker in ((0, -0.12, 'o'), (1, 0.12, '^')):
+            y = [self.gains[k][side] for k in self.order]
+            ax.scatter(x + offset, y, s=70, marker=marker, c=[self.color(k) for k in self.order],
+                       edgecolor='k', zorder=3)
+        ax.axhline(1, color="#888", linestyle="--", linewidth=1.5, zorder=1)
+        ax.set_xticks(x)
+        ax.set_xticklabels([str(n + 1) for n in x])
+        ax.set_xlim(-0.5, max(len(self.order), 1) - 0.5)
+        top = np.nanmax([g for k in self.order for g in self.gains[k]] + [1.0])
+        ax.set_ylim(0, max(1.25, top + 0.1))
+        ax.set_xlabel("Test (● left, ▲ right)", fontsize=8)
@@ -0,0 +1,169 @@
+# Tk window comparing several tests: gain/PR table over the overlays of comparison.py
+import tkinter as tk
+from tkinter import Toplevel, Button, filedialog, messagebox, ttk
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from analysis import window_closed, window_opened
+from comparison import ComparisonPlots, TABLE_COLUMNS, load_entries, table_row
+from analysis_window import resource_path
+from test_loader import test_identity
+
+MAX_ERRORS_SHOWN = 15  # lines of the failed-tests dialog
+
+
+class ComparisonWindow:
+    """
+    Compares tests on shared axes. The tests of each add() are loaded in a single
+    worker job that skips those already shown, and every test is drawn and listed
+    as soon as its metrics arrive; those that cannot be analyzed are listed in one
+    dialog once the job ends. Closing the window drops its arrays.
+    """
+
+    def __init__(self, tests, runner):
+        self.runner = runner
+        self.entries = {}  # key -> entry, in display order
+        self.pending = []  # tests requested but not delivered yet
+        self.errors = []  # 'label: error' of the tests that could not be loaded, shown once loading ends
+        win = self.win = Toplevel()
+        win.title("VOR Comparison")
+        win.geometry("1500x950")
+        win.configure(bg="#242426")
+        win.iconbitmap(resource_path('vvor_icon.ico'))
+        self.channel = ('compare', str(win))
+
+        top = tk.Frame(win, bg="#242426")
+        top.pack(fill=tk.X, padx=10, pady=(8, 4))
+        columns = [key for key, _, _ in TABLE_COLUMNS]
+        self.table = ttk.Treeview(top, columns=columns, show='headings', height=6, selectmode='extended')
+        for key, title, _ in TABLE_COLUMNS:
+            self.table.heading(key, text=title)
+            self.table.column(key, width=230 if key == 'label' else 80, anchor='w' if key == 'label' else 'e')
+        self.table.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        buttons = tk.Frame(top, bg="#242426")
+        buttons.pack(side=tk.LEFT, padx=(10, 0), anchor='n')
+        Button(buttons, text="➖ Remove Selected", font=('Arial', 11), width=16,
+               command=self.remove_selected).pack(fill=tk.X, pady=2)
+        Button(buttons, text="💾 Save Figure", font=('Arial', 11), width=16,
+               command=self.save_figure).pack(fill=tk.X, pady=2)
+        self.status = tk.Label(buttons, text="", fg="white", bg="#242426", font=('Arial', 10))
+        self.status.pack(fill=tk.X, pady=(6, 0))
+        self.progress = ttk.Progressbar(buttons, mode='indeterminate', length=140)
+
+        plot_frame = tk.Frame(win, bg="#242426")
+        plot_frame.pack(fill=tk.BOTH, expand=True)
+        self.fig, axs = plt.subplots(2, 2, figsize=(15, 7.8))
+        self.fig.subplots_adjust(hspace=0.4, wspace=0.22)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=plot_frame)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.plots = ComparisonPlots(self.fig, axs)
+        self.canvas.draw()
+
+        win.bind('<Destroy>', self._on_destroy)
+        self.add(tests)
+
+    @property
+    def alive(self):
+        return self.win is not None
+
+    def add(self, tests):
+        """Adds tests to the comparison; those already shown or loading are skipped."""
+        queued = set(self.entries) | {test_identity(t) for t in self.pending}
+        for test in tests:
+            key = test_identity(test)
+            if key not in queued:
+                queued.add(key)
+                self.pending.append(test)
+        if not self.pending:
+            return
+        # A job still running is superseded: it has delivered what it finished, and
+        # the new one resumes from the tests not delivered yet
+        pending, shown = list(self.pending), set(self.entries)
+        self._show_progress(True)
+        self.runner.submit(self.channel, lambda progress: load_entries(pending, shown, progress),
+                           self._loaded, self._failed, on_progress=self._add_entry)
+
+    def _add_entry(self, entry):
+        if self.win is None:
+            return
+        self.pending = [t for t in self.pending if test_identity(t) != entry['key']]
+        if 'error' in entry:
+            self.errors.append(f"{entry['label']}: {entry['error']}")
+            return
+        if entry['key'] in self.entries:
+            return
+        self.entries[entry['key']] = entry
+        window_opened(entry['key'])
+        self.plots.add(entry)
+        color = self.plots.color(entry['key'])
+        self.table.tag_configure(str(len(self.entries)), foreground=color)
+        self.table.insert('', tk.END, iid=repr(entry['key']), values=table_row(entry),
+                          tags=(str(len(self.entries)),))
+        self.canvas.draw_idle()
+        self.status.config(text=f"{len(self.entries)} test(s)")
+
+    def _loaded(self, _):
+        self.pending = []
+        self._show_progress(False)
+        self._report_errors()
+
+    def _failed(self, exc):
+        self._show_progress(False)
+        if self.win is not None:
+            messagebox.showerror("Error", f"{type(exc).__name__}: {exc}", parent=self.win)
+        self._report_errors()
+
+    def _report_errors(self, shown=MAX_ERRORS_SHOWN):
+        # One dialog for all the tests of a load that could not be analyzed
+        errors, self.errors = self.errors, []
+        if not errors or self.win is None:
+            return
+        lines = errors[:shown]
+        if len(errors) > shown:
+            lines.append(f"… and {len(errors) - shown} more")
+        messagebox.showwarning("Comparison", f"{len(errors)} test(s) could not be compared:\n\n" + '\n'.join(lines),
+                               parent=self.win)
+
+    def _show_progress(self, active):
+        if self.win is None:
+            return
+        if active:
+            self.progress.pack(fill=tk.X, pady=(6, 0))
+            self.progress.start(15)
+        else:
+            self.progress.stop()
+            self.progress.pack_forget()
+
+    def remove_selected(self):
+        for key in [k for k in self.entries if repr(k) in self.table.selection()]:
+            window_closed(key, self.entries.pop(key)['test'])
+            self.plots.remove(key)
+            self.table.delete(repr(key))
+        self._retag()
+        self.canvas.draw_idle()
+        self.status.config(text=f"{len(self.entries)} test(s)")
+
+    def _retag(self):
+        # Row colours follow the plot colours, which follow the order of the tests
+        for n, key in enumerate(self.entries, 1):
+            self.table.tag_configure(str(n), foreground=self.plots.color(key))
+            self.table.item(repr(key), tags=(str(n),))
+
+    def save_figure(self):
+        path = filedialog.asksaveasfilename(parent=self.win, defaultextension=".png",
+                                            filetypes=[("PNG Image", "*.png"), ("PDF Document", "*.pdf")])
+        if path:
+            self.fig.savefig(path, dpi=150)
+
+    def _on_destroy(self, event):
+        if event.widget is not self.win:
+            return
+        self.runner.cancel(self.channel)
+        # The arrays are only referenced here and by the figure: release both
+        plt.close(self.fig)
+        for key, entry in self.entries.items():
+            window_closed(key, entry['test'])
+        self.entries.clear()
+        self.pending = []
+        self.errors = []
+        self.win = None
@@ -0,0 +1,116 @@
+# Per-half-cycle gains, peaks, saccade latency and frequency as columnar arrays
+import numpy as np
+
+Fs = 250  # Hz
+MIN_GAIN_CYCLES = 2  # fewer valid half cycles than this give NaN statistics
+
+COLUMNS = ('start', 'end', 'left', 'valid', 't_start', 'duration', 'freq', 'peak_head', 'peak_eye',
+           'head_auc', 'eye_auc', 'gain_auc', 'saccade', 'latency')
+
+
+def _segment_reduce(ufunc, x, starts, stop):
+    """ufunc.reduceat of x over the contiguous segments [starts[i], starts[i+1]), the last ending at stop."""
+    first = starts[0]
+    return ufunc.reduceat(x[first:stop], starts - first)
+
+
+def half_cycle_table(t, h, desac_e, segments):
+    """
+    One row per half cycle (head velocity between two zero crossings), computed with
+    segment reductions over the whole recording, no per-cycle loop:
+    - start/end: sample range [start, end); left: head velocity > 0 in it
+    - valid: the amplitude gate of the PR score (>= 4 samples, peak head >= 15 °/s)
+    - t_start, duration (s) and freq (Hz, one over twice the duration)
+    - peak_head / peak_eye: max |h| and max |desaccaded eye| (°/s)
+    - head_auc / eye_auc / gain_auc: trapezoid areas and their ratio, signed eye
+      area on the left and |eye| area on the right, as for the window AUC gains
+    - saccade: index of the first catch-up saccade (-1 if none); latency (s) from
+      the start of the half cycle, NaN without a saccade
+    `segments` is the output of analysis_calculations.half_cycle_saccades(e, h).
+    Returns a dict of equal-length arrays (columns), ordered by time.
+    """
+    starts, ends, left, valid, first_peak = segments
+    k = len(starts)
+    if k == 0:
+        return empty_table()
+    stop = ends[-1]
+    abs_d = np.abs(desac_e)
+    eye = np.where(h > 0, desac_e, abs_d)  # the sign of h is constant within a half cycle
+    last = ends - 1
+
+    head_sum = _segment_reduce(np.add, np.abs(h), starts, stop)
+    eye_sum = _segment_reduce(np.add, eye, starts, stop)
+    head_auc = (head_sum - (np.abs(h[starts]) + np.abs(h[last])) / 2) / Fs
+    eye_auc = (eye_sum - (eye[starts] + eye[last]) / 2) / Fs
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gain_auc = np.where((ends - starts > 1) & (head_auc > 0), eye_auc / head_auc, np.nan)
+
+    duration = t[ends] - t[starts]
+    with np.errstate(divide='ignore'):
+        freq = np.where(duration > 0, 0.5 / duration, np.nan)
+    found = first_peak >= 0
+    latency = np.full(k, np.nan)
+    latency[found] = t[first_peak[found]] - t[starts[found]]
+    return {
+        'start': starts, 'end': ends, 'left': left, 'valid': valid,
+        't_start': t[starts], 'duration': duration, 'freq': freq,
+        'peak_head': _segment_reduce(np.maximum, np.abs(h), starts, stop),
+        'peak_eye': _segment_reduce(np.maximum, abs_d, starts, stop),
+        'head_auc': head_auc, 'eye_auc': eye_auc, 'gain_auc': gain_auc,
+        'saccade': first_peak, 'latency': latency,
+    }
+
+
+def empty_table():
+    table = {key: np.zeros(0) for key in COLUMNS}
+    for key in ('start', 'end', 'saccade'):
+        table[key] = np.zeros(0, dtype=np.intp)
+    table['left'] = table['valid'] = np.zeros(0, dtype=bool)
+    return table
+
+
+def select_cycles(table, lo, hi):
+    """Slice of the rows whose half cycle lies entirely inside the samples [lo, hi)."""
+    i0 = np.searchsorted(table['start'], lo, 'left')
+    i1 = np.searchsorted(table['end'], hi, 'right')
+    return slice(i0, max(i0, i1))
+
+
+def take(table, rows):
+    return {key: column[rows] for key, column in table.items()}
+
+
+def cycle_stats(table, rows=slice(None)):
+    """
+    Aggregates of the valid half cycles of each side (L, R) for the metrics dict:
+    count, median and interquartile range of the AUC gain, mean peak head velocity,
+    mean saccade latency and the median head frequency of both sides together.
+    """
+    sel = take(table, rows)
+    stats = {}
+    for side, mask in (('L', sel['left']), ('R', ~sel['left'])):
+        mask = mask & sel['valid']
+        gains = sel['gain_auc'][mask]
+        gains = gains[np.isfinite(gains)]
+        stats[f'n_cycles_{side}'] = len(gains)
+        if len(gains) >= MIN_GAIN_CYCLES:
+            q1, median, q3 = np.percentile(gains, (25, 50, 75))
+        else:
+            q1 = median = q3 = np.nan
+        stats[f'cycle_gain_{side}'] = median
+        stats[f'cycle_gain_{side}_iqr'] = q3 - q1
+        peaks = sel['peak_head'][mask]
+        stats[f'cycle_peak_head_{side}'] = np.mean(peaks) if len(peaks) else np.nan
+        latency = sel['latency'][mask]
+        latency = latency[np.isfinite(latency)]
+        stats[f'cycle_latency_{side}'] = np.mean(latency) if len(latency) else np.nan
+    freq = sel['freq'][sel['valid']]
+    freq = freq[np.isfinite(freq)]
+    stats['cycle_freq'] = np.median(freq) if len(freq) else np.nan
+    return stats
+
+
+def table_rows(table):
+    """Rows (one dict per half cycle) for CSV export, with plain Python scalars."""
+    keys = list(table)
+    return [dict(zip(keys, values)) for values in zip(*(table[key].tolist() for key in keys))]
@@ -0,0 +1,112 @@
+# Desaccade filters for the eye velocity signal, whole-array and chunked
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+METHODS = ('mean', 'median', 'threshold')
+DEFAULT_THRESHOLD = 50.0  # °/s away from the local median marks a saccadic sample
+
+
+def desaccade_kernel(s):
+    """Length in samples of the desaccade window: 35 for VORS, 30 for VVOR."""
+    return 35 if s else 30
+
+
+def desaccade(e, s, method='mean', threshold=DEFAULT_THRESHOLD):
+    """
+    Desaccaded eye velocity of a whole recording, as used by calculate_all_metrics.
+    The default moving average is the original np.convolve(..., mode='same'), so its
+    output is bit-identical to earlier versions; the other methods go through
+    DesaccadeFilter. Signals shorter than the kernel are returned unfiltered.
+    """
+    kernel = desaccade_kernel(s)
+    if len(e) == 0:
+        return np.array([])
+    if len(e) < kernel:
+        return e.copy()
+    if method == 'mean':
+        return np.convolve(e, np.ones(kernel) / kernel, mode='same')
+    return filter_signal(e, kernel, method, threshold)
+
+
+def running_mean(e, kernel):
+    """
+    O(n) running-sum equivalent of np.convolve(e, ones(kernel)/kernel, 'same'),
+    equal to it up to floating-point rounding (about 1e-13 relative).
+    """
+    return filter_signal(e, kernel, 'mean')
+
+
+def filter_signal(e, kernel, method='mean', threshold=DEFAULT_THRESHOLD):
+    """Whole-array run of a DesaccadeFilter: same length as e, centred like mode='same'."""
+    f = DesaccadeFilter(kernel, method, threshold)
+    return np.concatenate((f.process(e), f.flush()))
+
+
+class DesaccadeFilter:
+    """
+    Stateful desaccade filter over the window e[i - kernel//2 .. i + (kernel-1)//2],
+    the same centring as np.convolve(..., mode='same'). Chunks of any size go
+    through process(), which returns every output sample whose window is complete,
+    so outputs lag the input by (kernel - 1) // 2 samples; flush() returns the rest
+    at the end of the signal. Only the last kernel - 1 input samples are kept.
+
+    method:
+    - 'mean': moving average by running sums, zero padded at the ends like np.convolve
+    - 'median': moving median, robust to the short saccadic spikes
+    - 'threshold': samples further than `threshold` °/s from the moving median are
+      replaced by it; all others pass unchanged
+    Median-based methods repeat the edge samples instead of zero padding.
+    """
+
+    def __init__(self, kernel, method='mean', threshold=DEFAULT_THRESHOLD):
+        if method not in METHODS:
+            raise ValueError(f"Unknown desaccade method: {method} (expected one of {', '.join(METHODS)})")
+        self.kernel = kernel
+        self.method = method
+        self.threshold = threshold
+        self.before, self.after = kernel // 2, (kernel - 1) // 2
+        self.delay = self.after
+        self._history = None
+
+    def reset(self):
+        self._history = None
+
+    def _pad(self, edge, n):
+        if self.method == 'mean' or len(edge) == 0:
+            return np.zeros(n)
+        return np.full(n, edge[0])
+
+    def _apply(self, x):
+        """Outputs of every complete window of x (len(x) - kernel + 1 samples)."""
+        k = self.kernel
+        if self.method == 'mean':
+            csum = np.concatenate(([0.0], np.cumsum(x)))
+            return (csum[k:] - csum[:-k]) / k
+        median = np.median(sliding_window_view(x, k), axis=1)
+        if self.method == 'median':
+            return median
+        center = x[self.before:self.before + len(median)]
+        return np.where(np.abs(center - median) > self.threshold, median, center)
+
+    def process(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if self._history is None:
+            if len(chunk) == 0:
+                return np.zeros(0)
+            self._history = self._pad(chunk[:1], self.before)
+        x = np.concatenate((self._history, chunk))
+        n_out = len(x) - self.kernel + 1
+        if n_out <= 0:
+            self._history = x
+            return np.zeros(0)
+        self._history = x[n_out:]
+        return self._apply(x)
+
+    def flush(self):
+        if self._history is None:
+            return np.zeros(0)
+        x = np.concatenate((self._history, self._pad(self._history[-1:], self.after)))
+        self._history = None
+        if len(x) < self.kernel:
+            return np.zeros(0)
+        return self._apply(x)
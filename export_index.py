@@ -0,0 +1,97 @@
+# Persistent byte-offset index for export files
+import hashlib
+import json
+import os
+from export_parser import iter_tests
+from test_record import TestRecord
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.vvoridx'
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'vvor')
+HASH_SAMPLE = 64 * 1024  # bytes hashed at the head, middle and tail of the file
+
+_TEST_KEYS = ('uid', 'guid', 'tipo', 'fecha', 'list_sep', 'dec_sep',
+              'start', 'header_end', 'data_start', 'end')
+
+
+def file_signature(filepath):
+    """
+    Identifies one version of an export: absolute path, size, mtime and a
+    hash of sampled content, so that the check stays cheap on huge files.
+    """
+    st = os.stat(filepath)
+    digest = hashlib.blake2b(str(st.st_size).encode(), digest_size=16)
+    with open(filepath, 'rb') as f:
+        for offset in (0, st.st_size // 2, st.st_size - HASH_SAMPLE):
+            f.seek(max(offset, 0))
+            digest.update(f.read(HASH_SAMPLE))
+    return {
+        'path': os.path.abspath(filepath),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'hash': digest.hexdigest(),
+    }
+
+
+def index_paths(filepath):
+    """Candidate index locations: a sidecar next to the export, then the user cache."""
+    abspath = os.path.abspath(filepath)
+    name = hashlib.sha1(abspath.encode('utf-8')).hexdigest() + INDEX_SUFFIX
+    return [abspath + INDEX_SUFFIX, os.path.join(CACHE_DIR, name)]
+
+
+def load_index(filepath, signature=None):
+    """Returns the indexed tests of `filepath`, or None if there is no valid index."""
+    signature = signature or file_signature(filepath)
+    for path in index_paths(filepath):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if index.get('version') == INDEX_VERSION and index.get('signature') == signature:
+            return [TestRecord(**test, path=filepath) for test in index['tests']]
+    return None
+
+
+def save_index(filepath, tests, signature):
+    index = {
+        'version': INDEX_VERSION,
+        'signature': signature,
+        'tests': [{key: test[key] for key in _TEST_KEYS} for test in tests],
+    }
+    for path in index_paths(filepath):
+        tmp_path = path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+            os.replace(tmp_path, path)
+            return path
+        except OSError:
+            continue  # read-only folder, try the next location
+    return None
+
+
+def iter_indexed_tests(filepath):
+    """
+    Yields the tests of an export from its index when it is still valid,
+    otherwise re-scans the file and writes a fresh index once the scan completes.
+    """
+    signature = file_signature(filepath)
+    tests = load_index(filepath, signature)
+    if tests is not None:
+        yield from tests
+        return
+
+    tests = []
+    for test in iter_tests(filepath):
+        tests.append(test)
+        yield test
+    # Only persist if the file did not change while it was being scanned
+    if file_signature(filepath) == signature:
+        save_index(filepath, tests, signature)
+
+
+def load_tests(filepath):
+    return list(iter_indexed_tests(filepath))
@@ -0,0 +1,108 @@
+# Streaming parser for multi-test export files
+import mmap
+import re
+from test_record import TestRecord
+
+TEST_MARKER = b'<TestUID>'
+CHUNK_SIZE = 1 << 20  # 1 MiB per read
+
+_FIELDS = {
+    'uid': re.compile(rb'<TestUID>(.*?)</TestUID>'),
+    'guid': re.compile(rb'<TestGUID>(.*?)</TestGUID>'),
+    'tipo': re.compile(rb'<TestType>(.*?)</TestType>'),
+    'fecha': re.compile(rb'<StartDateTime>(.*?)</StartDateTime>'),
+    'list_sep': re.compile(rb'<ListSeparator>(.*?)</ListSeparator>'),
+    'dec_sep': re.compile(rb'<DecimalSeparator>(.*?)</DecimalSeparator>'),
+}
+_DEC_SEP_CLOSE = b'</DecimalSeparator>'
+
+
+def _header_bounds(buf, start, eof):
+    """
+    Locates the end of the header line and the start of the numeric rows
+    (the line after the column names) for the test beginning at `start`.
+    Returns (None, None) when more data must be read first.
+    """
+    next_test = buf.find(TEST_MARKER, start + len(TEST_MARKER))
+    limit = next_test if next_test >= 0 else len(buf)
+    sep = buf.find(_DEC_SEP_CLOSE, start, limit)
+    if sep < 0:
+        if next_test >= 0 or eof:
+            return limit, limit
+        return None, None
+    header_end = buf.find(b'\n', sep, limit)
+    if header_end < 0:
+        return (limit, limit) if next_test >= 0 or eof else (None, None)
+    header_end += 1
+    data_start = buf.find(b'\n', header_end, limit)
+    if data_start < 0:
+        return (header_end, limit) if next_test >= 0 or eof else (None, None)
+    return header_end, data_start + 1
+
+
+def _parse_header(header):
+    fields = {}
+    for key, pattern in _FIELDS.items():
+        m = pattern.search(header)
+        fields[key] = m.group(1).decode('utf-8', errors='replace') if m else None
+    return fields
+
+
+def iter_tests(filepath, chunk_size=CHUNK_SIZE):
+    """
+    Scans an export file chunk by chunk and yields one TestRecord per test as soon
+    as its header has been read. Only header fields and byte offsets are kept:
+    start/header_end delimit the header line, data_start/end the numeric rows.
+    """
+    with open(filepath, 'rb') as f:
+        buf = b''
+        base = 0  # file offset of buf[0]
+        eof = False
+        pending = None
+        while True:
+            start = buf.find(TEST_MARKER)
+            if start < 0:
+                if eof:
+                    break
+                # Keep a short tail in case a marker straddles two chunks
+                drop = max(len(buf) - len(TEST_MARKER) + 1, 0)
+                base += drop
+                buf = buf[drop:]
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf += chunk
+                continue
+
+            header_end, data_start = _header_bounds(buf, start, eof)
+            while data_start is None:
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf += chunk
+                header_end, data_start = _header_bounds(buf, start, eof)
+
+            if pending is not None:
+                pending['end'] = base + start
+                yield pending
+                pending = None
+
+            fields = _parse_header(buf[start:header_end])
+            if None not in (fields['uid'], fields['tipo'], fields['fecha']):
+                pending = TestRecord(**fields, path=filepath,
+                                     start=base + start,
+                                     header_end=base + header_end,
+                                     data_start=base + data_start)
+            base += data_start
+            buf = buf[data_start:]
+
+        if pending is not None:
+            pending['end'] = base + len(buf)
+            yield pending
+
+
+def read_test_data(test):
+    """Returns the raw bytes of the numeric rows of one test, read through mmap."""
+    if test['data_start'] >= test['end']:
+        return b''
+    with open(test['path'], 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm[test['data_start']:test['end']]
@@ -1,26 +1,73 @@
 # Fourier transform, SPI, SNR calculation
+from functools import lru_cache
 import numpy as np
+from scipy import fft as sp_fft
 
-def compute_fft(data, Fs=250):
+@lru_cache(maxsize=32)
+def fft_frequencies(L, Fs=250, n=None):
     """
-    Computes the single-sided amplitude spectrum of a signal.
-    Returns: frequency vector, amplitude spectrum, SPI, SNR
+    Frequency vector of the single-sided spectrum of an L-sample signal, zero padded
+    to n samples. Cached and read-only, since the same lengths come back on every window.
     """
-    L = len(data)
-    Y = np.fft.fft(data)
-    P2 = np.abs(Y / L)
-    P1 = P2[:L//2 + 1]
-    if L > 2:
-        P1[1:-1] = 2 * P1[1:-1]
-    f = Fs * np.arange(0, L//2 + 1) / L
+    n = n or L
+    f = Fs * np.arange(0, n//2 + 1) / n
+    f.setflags(write=False)
+    return f
 
-    # SPI = max peak / total energy
-    max_val = np.max(P1)
-    spi = max_val / np.sum(P1) if np.sum(P1) != 0 else 0
+def fast_length(L):
+    """Smallest length >= L that the FFT handles efficiently (only factors 2, 3, 5)."""
+    return sp_fft.next_fast_len(L, real=True)
 
-    # SNR = 10 * log10(signal / noise)
-    noise_power = np.sum(P1) - max_val
-    snr = 10 * np.log10(max_val / noise_power) if noise_power > 0 else 0
+def amplitude_spectra(signals, Fs=250, pad=False):
+    """
+    Single-sided amplitude spectra of equal-length signals, one per row, from a single
+    real-input transform. With pad=True the signals are zero padded to a fast FFT
+    length, which refines the frequency grid but changes the bins (and so SPI/SNR).
+    Returns: frequency vector, (k, n//2 + 1) amplitude spectra
+    """
+    signals = np.atleast_2d(np.asarray(signals, dtype=np.float64))
+    L = signals.shape[-1]
+    n = fast_length(L) if pad else L
+    P1 = np.abs(sp_fft.rfft(signals, n=n, axis=-1)) / L
+    if n > 2:
+        P1[:, 1:-1] *= 2
+    return fft_frequencies(L, Fs, n if pad else None), P1
 
-    return f, P1, spi, snr
+def spectrum_stats(P1):
+    """
+    SPI (max peak / total energy) and SNR (10 * log10(signal / noise)) of each
+    amplitude spectrum in the last axis.
+    """
+    P1 = np.atleast_2d(P1)
+    max_val = np.max(P1, axis=-1)
+    total = np.sum(P1, axis=-1)
+    noise_power = total - max_val
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spi = np.where(total != 0, max_val / total, 0)
+        snr = np.where(noise_power > 0, 10 * np.log10(max_val / noise_power), 0)
+    return spi, snr
 
+def compute_fft(data, Fs=250, pad=False):
+    """
+    Computes the single-sided amplitude spectrum of a signal.
+    Returns: frequency vector, amplitude spectrum, SPI, SNR
+    """
+    f, P1 = amplitude_spectra(data, Fs, pad)
+    spi, snr = spectrum_stats(P1)
+    return f, P1[0], spi[0], snr[0]
+
+def compute_ffts(signals, Fs=250, pad=False):
+    """
+    compute_fft of several signals, stacking those of equal length into one 2-D
+    transform. Returns the (f, P1, spi, snr) tuples in input order.
+    """
+    by_length = {}
+    for i, data in enumerate(signals):
+        by_length.setdefault(len(data), []).append(i)
+    results = [None] * len(signals)
+    for idx in by_length.values():
+        f, P1 = amplitude_spectra([signals[i] for i in idx], Fs, pad)
+        spi, snr = spectrum_stats(P1)
+        for row, i in enumerate(idx):
+            results[i] = (f, P1[row], spi[row], snr[row])
+    return results
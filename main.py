@@ -1,44 +1,29 @@
 #VVOR main file
 
+from startup import ENV_VAR as STARTUP_REPORT_VAR, Startup
+import argparse
+import importlib
 import tkinter as tk
-from tkinter import filedialog, messagebox
-import re
-from analysis import analyze_test_block
+from tkinter import filedialog, messagebox, ttk
+from profiling import stage
+from task_runner import TaskRunner
+from test_browser import TestIndex, TestTable
+from test_loader import iter_export_tests
 import sys
 import os
 
+# analysis, comparison_window and batch_analysis (NumPy, SciPy, matplotlib) are imported
+# when first needed, usually already preloaded by startup.Startup while a file is picked
+
+ALL_TYPES = "All types"
+REFRESH_DELAY_MS = 150
+
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
     base_path = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
     return os.path.join(base_path, relative_path)
 
-
-# ----- Step 1: Load .txt and parse tests -----
-def load_and_parse_tests(filepath):
-    with open(filepath, 'r', encoding='utf-8') as f:
-        raw_text = f.read()
-
-    start_indices = [m.start() for m in re.finditer(r'<TestUID>', raw_text)]
-    if not start_indices:
-        return []
-
-    end_indices = start_indices[1:] + [len(raw_text)]
-
-    tests = []
-    for start, end in zip(start_indices, end_indices):
-        block = raw_text[start:end]
-        uid = re.search(r'<TestUID>(.*?)</TestUID>', block)
-        tipo = re.search(r'<TestType>(.*?)</TestType>', block)
-        fecha = re.search(r'<StartDateTime>(.*?)</StartDateTime>', block)
-        
-        if uid and tipo and fecha:
-            tests.append({
-                'uid': uid.group(1),
-                'tipo': tipo.group(1),
-                'fecha': fecha.group(1),
-                'raw': block
-            })
-    return tests
+# ----- Step 1: Load .txt/.vvb and parse tests (see test_loader.iter_export_tests) -----
 
 # ----- Step 2: GUI Application -----
 class VORApp:
@@ -48,19 +33,55 @@ class VORApp:
 
         self.tests = []
         self.file_path = None
+        # Parsing and metric computation run here, off the Tk main loop
+        self.runner = TaskRunner(root)
+        # Batches get their own worker, created at the first one: a long batch must
+        # not hold up analyses, comparisons and list reloads queued on self.runner
+        self.batch_runner = None
+        self._busy = set()
 
         # GUI layout
         self.load_button = tk.Button(root, text="Open .txt File", command=self.open_file)
         self.load_button.pack(pady=10)
 
-        self.listbox = tk.Listbox(root, width=80, height=10)
-        self.listbox.pack(pady=5)
+        # Filters: search text (UID, date, type, GUID), test type and date range
+        filter_frame = tk.Frame(root)
+        filter_frame.pack(fill=tk.X, padx=10)
+        self.search_var = tk.StringVar()
+        self.type_var = tk.StringVar(value=ALL_TYPES)
+        self.from_var = tk.StringVar()
+        self.to_var = tk.StringVar()
+        tk.Label(filter_frame, text="Search:").pack(side=tk.LEFT)
+        tk.Entry(filter_frame, textvariable=self.search_var, width=22).pack(side=tk.LEFT, padx=(2, 8))
+        tk.OptionMenu(filter_frame, self.type_var, ALL_TYPES, "VVOR", "VORS").pack(side=tk.LEFT, padx=(0, 8))
+        tk.Label(filter_frame, text="From:").pack(side=tk.LEFT)
+        tk.Entry(filter_frame, textvariable=self.from_var, width=11).pack(side=tk.LEFT, padx=(2, 8))
+        tk.Label(filter_frame, text="To:").pack(side=tk.LEFT)
+        tk.Entry(filter_frame, textvariable=self.to_var, width=11).pack(side=tk.LEFT, padx=2)
+        self.count_label = tk.Label(filter_frame, text="")
+        self.count_label.pack(side=tk.RIGHT)
+        for var in (self.search_var, self.type_var, self.from_var, self.to_var):
+            var.trace_add('write', lambda *args: self.schedule_refresh())
+        self._refresh_job = None
+
+        self.index = TestIndex()
+        self.table = TestTable(root, self.index, on_activate=self.analyze_test)
+        self.table.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
 
-        self.select_button = tk.Button(root, text="Analyze Selected Test", command=self.select_test)
-        self.select_button.pack(pady=5)
+        button_frame = tk.Frame(root)
+        button_frame.pack(pady=5)
+        self.select_button = tk.Button(button_frame, text="Analyze Selected Test", command=self.select_test)
+        self.select_button.pack(side=tk.LEFT, padx=4)
+        self.batch_button = tk.Button(button_frame, text="Batch Analyze Selected…", command=self.batch_selected)
+        self.batch_button.pack(side=tk.LEFT, padx=4)
+        self.compare_button = tk.Button(button_frame, text="Compare Selected", command=self.compare_selected)
+        self.compare_button.pack(side=tk.LEFT, padx=4)
+        self.comparison = None  # the open comparison window, which Compare Selected adds to
+
+        self.progress = ttk.Progressbar(root, mode='indeterminate', length=300)
 
     def open_file(self):
-        filetypes = [('Text files', '*.txt')]
+        filetypes = [('Text files', '*.txt'), ('VVOR binary cache', '*.vvb')]
         filepath = filedialog.askopenfilename(title="Select VOR data file", filetypes=filetypes)
         if not filepath:
             return
@@ -68,31 +89,188 @@ class VORApp:
         self.file_path = filepath
         self.load_tests_from_path(filepath)
 
+    def set_busy(self, task, active):
+        was_busy = bool(self._busy)
+        if active:
+            self._busy.add(task)
+        else:
+            self._busy.discard(task)
+        if self._busy and not was_busy:
+            self.progress.pack(pady=(0, 10))
+            self.progress.start(15)
+        elif not self._busy and was_busy:
+            self.progress.stop()
+            self.progress.pack_forget()
+
     def load_tests_from_path(self, filepath):
-        self.tests = load_and_parse_tests(filepath)
-        self.listbox.delete(0, tk.END)
+        # Tests come from a binary cache or a valid saved index when available,
+        # otherwise they are streamed into the test list while the worker scans the file.
+        # Opening another file supersedes the scan in progress.
+        self.tests = []
+        self.index.clear()
+        self.table.clear_selection()
+        self.refresh_list()
+        self.set_busy('scan', True)
+        self.runner.submit('scan', lambda progress: self._scan_file(filepath, progress),
+                           self._scan_done, self._scan_failed, on_progress=self._add_test)
+
+    @staticmethod
+    def _scan_file(filepath, progress):
+        scan = iter_export_tests(filepath)
+        with stage('parse.scan', bytes=os.path.getsize(filepath)) as timing:
+            try:
+                for n, test in enumerate(scan, 1):
+                    progress(test)
+                    timing.set(tests=n)
+            finally:
+                scan.close()
 
+    def _add_test(self, test):
+        self.tests.append(test)
+        self.index.add(test)
+        self.schedule_refresh()
+
+    def schedule_refresh(self, delay=REFRESH_DELAY_MS):
+        # Typing and streamed tests coalesce into one filter pass
+        if self._refresh_job is None:
+            self._refresh_job = self.root.after(delay, self.refresh_list)
+
+    def refresh_list(self):
+        if self._refresh_job is not None:
+            self.root.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        kind = self.type_var.get()
+        rows = self.index.filter(self.search_var.get(), None if kind == ALL_TYPES else kind,
+                                 self.from_var.get().strip() or None, self.to_var.get().strip() or None)
+        self.table.set_rows(rows)
+        self.count_label.config(text=f"{len(rows)} of {len(self.index)} tests")
+
+    def _scan_done(self, _):
+        self.set_busy('scan', False)
+        self.refresh_list()
         if not self.tests:
             messagebox.showerror("No Tests Found", "No <TestUID> blocks found in file.")
-            return
 
-        for i, test in enumerate(self.tests):
-            label = f"{test['fecha']} | {test['tipo']}"
-            self.listbox.insert(tk.END, label)
+    def _scan_failed(self, exc):
+        self.set_busy('scan', False)
+        messagebox.showerror("Error", f"Could not read {os.path.basename(self.file_path)}: {exc}")
 
     def select_test(self):
-        index = self.listbox.curselection()
-        if not index:
+        selection = self.table.selection()
+        if not selection:
             messagebox.showwarning("No Selection", "Please select a test from the list.")
             return
+        cursor = self.table.cursor
+        self.analyze_test(cursor if cursor in selection else selection[0])
+
+    def analyze_test(self, i):
+        test = self.index.tests[i]
+        self.set_busy('analysis', True)
+
+        def imported(analysis):
+            analysis.analyze_test_block(test, self.runner, on_finished=lambda: self.set_busy('analysis', False))
+
+        def failed(exc):
+            self.set_busy('analysis', False)
+            messagebox.showerror("Error", f"Could not load the analysis: {exc}")
+
+        # Imported on the worker so that a preload still in progress does not block Tk
+        self.runner.submit('analysis', lambda: importlib.import_module('analysis'), imported, failed)
+
+    def compare_selected(self):
+        tests = [self.index.tests[i] for i in self.table.selection()]
+        if self.comparison is not None and self.comparison.alive:
+            if not tests:
+                messagebox.showwarning("No Selection", "Please select the tests to add to the comparison.")
+                return
+            self.comparison.add(tests)
+            self.comparison.win.lift()
+            return
+        if len(tests) < 2:
+            messagebox.showwarning("No Selection", "Please select at least two tests to compare.")
+            return
+
+        def imported(module):
+            self.comparison = module.ComparisonWindow(tests, self.runner)
+
+        def failed(exc):
+            messagebox.showerror("Error", f"Could not load the comparison: {exc}")
+
+        self.runner.submit('comparison', lambda: importlib.import_module('comparison_window'), imported, failed)
+
+    def batch_selected(self):
+        tests = [self.index.tests[i] for i in self.table.selection()]
+        if not tests:
+            messagebox.showwarning("No Selection", "Please select the tests to analyze.")
+            return
+        output = filedialog.asksaveasfilename(title="Save batch metrics", defaultextension=".csv",
+                                              filetypes=[("CSV", "*.csv")])
+        if not output:
+            return
+
+        def run(progress):
+            import multiprocessing
+            from batch_analysis import run_batch, write_csv
+            # Spawned, not forked: this process runs Tk and other threads
+            batch = run_batch(tests, mp_context=multiprocessing.get_context('spawn'))
+            partial_output = output + '.part'
+
+            def rows():
+                for n, row in enumerate(batch, 1):
+                    progress(n)  # raises once a newer batch supersedes this one
+                    yield row
+            try:
+                write_csv(rows(), partial_output)
+                os.replace(partial_output, output)
+            except BaseException:
+                # Superseded or failed: no half-written CSV is left behind
+                if os.path.exists(partial_output):
+                    os.remove(partial_output)
+                raise
+            finally:
+                batch.close()  # cancels the tests the pool has not started
+            return output
+
+        self.set_busy('batch', True)
+        self.count_label.config(text=f"Batch: 0/{len(tests)}")
+        if self.batch_runner is None:
+            self.batch_runner = TaskRunner(self.root)
+        self.batch_runner.submit('batch', run, self._batch_done, self._batch_failed,
+                                 on_progress=lambda n: self.count_label.config(text=f"Batch: {n}/{len(tests)}"))
+
+    def _batch_done(self, output):
+        self.set_busy('batch', False)
+        self.refresh_list()
+        messagebox.showinfo("Batch Analysis", f"Metrics written to {output}")
 
-        test = self.tests[index[0]]
-        analyze_test_block(test)
+    def _batch_failed(self, exc):
+        self.set_busy('batch', False)
+        self.refresh_list()
+        messagebox.showerror("Error", f"Batch analysis failed: {exc}")
 
 
 if __name__ == '__main__':
+    if getattr(sys, 'frozen', False):
+        # Batch pool workers of the PyInstaller build run this exe: they must not
+        # start the GUI. freeze_support() only acts when frozen, and importing
+        # multiprocessing would add ~8 ms to every source launch
+        import multiprocessing
+        multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="VVOR/VORS test viewer.")
+    parser.add_argument('--startup-report', action='store_true',
+                        help=f"print launch and preload timings to stderr (or set {STARTUP_REPORT_VAR}=1)")
+    parser.add_argument('--no-preload', action='store_true',
+                        help="import the analysis modules at the first analysis instead of in the background")
+    args = parser.parse_args()
+    startup = Startup(report=args.startup_report or os.environ.get(STARTUP_REPORT_VAR) == '1')
+    startup.mark('imports')
     root = tk.Tk()
     icon_path = resource_path('vvor_icon.ico')
     root.iconbitmap(icon_path)
+    startup.mark('Tk')
     app = VORApp(root)
+    startup.mark('layout')
+    if not args.no_preload:
+        startup.preload()
+    root.after_idle(startup.ready)
     root.mainloop()
@@ -0,0 +1,94 @@
+# Bounded LRU cache for metric results
+from collections import OrderedDict
+import threading
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 64
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _result_nbytes(metrics):
+    """Approximate memory held by a metrics dict (its arrays dominate)."""
+    total = 0
+    for value in metrics.values():
+        if isinstance(value, np.ndarray):
+            total += value.nbytes
+        elif isinstance(value, list):
+            total += 8 * len(value)
+        elif isinstance(value, dict):
+            total += _result_nbytes(value)
+    return total
+
+
+def metrics_key(test_key, tmin, tmax, s):
+    """Cache key of one analysis: test identity, window bounds and VVOR/VORS flag."""
+    return (test_key, float(tmin), float(tmax), int(s))
+
+
+class MetricsCache:
+    """
+    LRU cache of calculate_all_metrics results, bounded both by entry count and by
+    the size of the arrays it holds. hits/misses count lookups since the last clear().
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, metrics):
+        size = _result_nbytes(metrics)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (metrics, size)
+            self.nbytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def get_or_compute(self, key, compute):
+        metrics = self.get(key)
+        if metrics is None:
+            metrics = compute()
+            self.put(key, metrics)
+        return metrics
+
+    def discard(self, test_key):
+        """Drops every cached window of one test."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == test_key]:
+                self.nbytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self._entries), 'bytes': self.nbytes}
+
+
+# Shared by the analysis windows and batch runs of this process
+METRICS_CACHE = MetricsCache()
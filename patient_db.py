@@ -0,0 +1,265 @@
+# Local SQLite store of per-test metrics across exports and sessions
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from batch_analysis import FIELDS, METRIC_FIELDS, is_transient_error, run_batch
+from export_index import file_signature
+from test_loader import iter_export_tests, parse_start, test_type_name
+
+SCHEMA_VERSION = 1
+TEXT_FIELDS = ('file', 'uid', 'tipo', 'fecha', 'test_type', 'error', 'started', 'path', 'ingested')
+INTEGER_FIELDS = ('offset', 'samples', 'rejected_rows', 'n_saccades', 'n_cycles_L', 'n_cycles_R')
+# The gains in the type/date index let range filters on them skip the table rows
+INDEXED = {
+    'tests_started': ('started',),
+    'tests_type_started': ('test_type', 'started', 'gain_auc_L', 'gain_auc_R'),
+    'tests_uid': ('uid',),
+    'tests_gain_auc_L': ('gain_auc_L',),
+    'tests_gain_auc_R': ('gain_auc_R',),
+}
+# Columns stored for every test: the batch analysis row, plus where it came from
+COLUMNS = [f for f in FIELDS if f != 'guid'] + ['started', 'path', 'offset', 'ingested']
+QUERY_COLUMNS = ['guid'] + COLUMNS
+
+
+def test_guid(test):
+    """TestGUID of a test; exports without one fall back to UID, date and type."""
+    return test.get('guid') or f"{test['uid']}|{test['fecha']}|{test['tipo']}"
+
+
+def _sql_type(column):
+    if column in TEXT_FIELDS:
+        return 'TEXT'
+    return 'INTEGER' if column in INTEGER_FIELDS else 'REAL'
+
+
+def _number(value):
+    return 'nan' if value is None else f"{value:.2f}"
+
+
+class PatientDB:
+    """
+    Tests of every ingested export, one row per TestGUID with its header fields and
+    the metrics of batch_analysis. Exports whose signature is already recorded are
+    skipped, and within a new or changed export only tests with an unknown GUID are
+    analyzed, so re-ingesting a folder of exports only costs the new tests.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._create()
+
+    def close(self):
+        self.conn.execute('PRAGMA optimize')  # keeps the planner statistics current for the indexes
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _create(self):
+        cols = ',\n'.join(f'"{c}" {_sql_type(c)}' for c in COLUMNS)
+        with self.conn:
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS tests (guid TEXT PRIMARY KEY,\n{cols})')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, '
+                              'mtime_ns INTEGER, hash TEXT, tests INTEGER, ingested TEXT)')
+            for name, cols in INDEXED.items():
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON tests ({", ".join(cols)})')
+            self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM tests').fetchone()[0]
+
+    def stored_guids(self, guids):
+        """{guid: error} of the `guids` already stored ('' or None when analyzed)."""
+        stored = {}
+        guids = list(guids)
+        for i in range(0, len(guids), 500):
+            chunk = guids[i:i + 500]
+            marks = ','.join('?' * len(chunk))
+            stored.update(self.conn.execute(f'SELECT guid, error FROM tests WHERE guid IN ({marks})', chunk))
+        return stored
+
+    def known_guids(self, guids):
+        """
+        Subset of `guids` stored for good: analyzed, or failed a validation that
+        will fail again (batch_analysis.VALIDATION_ERRORS). Tests whose analysis
+        raised are left out, to be retried.
+        """
+        return {guid for guid, error in self.stored_guids(guids).items() if not is_transient_error(error)}
+
+    def _file_is_current(self, signature):
+        row = self.conn.execute('SELECT size, mtime_ns, hash FROM files WHERE path = ?',
+                                (signature['path'],)).fetchone()
+        return row is not None and tuple(row) == (signature['size'], signature['mtime_ns'], signature['hash'])
+
+    def ingest(self, paths, workers=None, force=False):
+        """
+        Analyzes and stores the new tests of the exports `paths`.
+        Tests that fail validation (unsupported type, no decimal separator, no
+        data) are stored with their error for good. Tests whose analysis raised
+        are stored too but analyzed again by the next ingest, which replaces their
+        row, and their export is not recorded as current until they succeed.
+        Returns (tests added, tests retried, tests already present, files skipped
+        as unchanged).
+        """
+        added = retried = duplicates = skipped = 0
+        for path in paths:
+            signature = file_signature(path)
+            if not force and self._file_is_current(signature):
+                skipped += 1
+                continue
+            tests = list(iter_export_tests(path))
+            stored = self.stored_guids(test_guid(t) for t in tests)
+            new, seen = [], set()
+            for test in tests:
+                guid = test_guid(test)
+                if (guid in stored and not is_transient_error(stored[guid])) or guid in seen:
+                    duplicates += 1
+                    continue
+                seen.add(guid)
+                new.append(test)
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            records, transient = [], 0
+            for test, row in zip(new, run_batch(new, workers)):
+                transient += is_transient_error(row['error'])
+                row.update(guid=test_guid(test), started=parse_start(test['fecha']),
+                           test_type=row.get('test_type') or test_type_name(test['tipo']),
+                           path=os.path.abspath(path), offset=test.get('start', test.get('offset')),
+                           ingested=now)
+                records.append(tuple(row.get(c) for c in QUERY_COLUMNS))
+            marks = ','.join('?' * len(QUERY_COLUMNS))
+            names = ','.join(f'"{c}"' for c in QUERY_COLUMNS)
+            with self.conn:
+                self.conn.executemany(f'INSERT OR REPLACE INTO tests ({names}) VALUES ({marks})', records)
+                if transient:
+                    self.conn.execute('DELETE FROM files WHERE path = ?', (signature['path'],))
+                else:
+                    self.conn.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)',
+                                      (signature['path'], signature['size'], signature['mtime_ns'],
+                                       signature['hash'], len(tests), now))
+            replaced = sum(test_guid(test) in stored for test in new)
+            retried += replaced
+            added += len(records) - replaced
+        return added, retried, duplicates, skipped
+
+    def query(self, test_type=None, uid=None, date_from=None, date_to=None, ranges=None,
+              errors=False, order='started', limit=None):
+        """
+        Stored tests matching every given filter, as dicts, ordered by `order`:
+        - test_type: 'VVOR'/'RVVO' or 'VORS'/'SRVO'
+        - date_from / date_to: 'YYYY-MM-DD[ HH:MM:SS]', both inclusive (a bare date_to
+          includes the whole day)
+        - ranges: {metric: (min, max)} with None for an open end, e.g.
+          {'gain_auc_L': (None, 0.7)}
+        Tests whose analysis failed are left out unless errors=True.
+        """
+        where, params = [], []
+        if test_type:
+            where.append('test_type = ?')
+            params.append(test_type_name(test_type) or test_type.upper())
+        if uid is not None:
+            where.append('uid = ?')
+            params.append(str(uid))
+        if date_from:
+            where.append('started >= ?')
+            params.append(date_from)
+        if date_to:
+            where.append('started <= ?')
+            params.append(date_to if len(date_to) > 10 else date_to + ' 23:59:59')
+        for field, (low, high) in (ranges or {}).items():
+            if field not in METRIC_FIELDS:
+                raise ValueError(f"Unknown metric: {field}")
+            if low is not None:
+                where.append(f'"{field}" >= ?')
+                params.append(low)
+            if high is not None:
+                where.append(f'"{field}" <= ?')
+                params.append(high)
+        if not errors:
+            where.append("(error IS NULL OR error = '')")
+        if order not in QUERY_COLUMNS:
+            raise ValueError(f"Unknown column: {order}")
+        sql = 'SELECT * FROM tests'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f' ORDER BY "{order}"'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        cursor = self.conn.execute(sql, params)
+        names = [d[0] for d in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+
+def _range(text):
+    """'gain_auc_L=0.7' style argument: returns (field, value)."""
+    field, sep, value = text.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected METRIC=VALUE, got {text!r}")
+    return field, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Store and query VVOR/VORS test metrics across exports.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    ingest = commands.add_parser('ingest', help="add the new tests of one or more exports")
+    ingest.add_argument('db')
+    ingest.add_argument('exports', nargs='+', help="export .txt files or .vvb binary caches")
+    ingest.add_argument('-j', '--workers', type=int, default=None,
+                        help="worker processes (default: one per CPU, 1 = no pool)")
+    ingest.add_argument('--force', action='store_true', help="rescan exports even if unchanged")
+    query = commands.add_parser('query', help="list stored tests matching filters")
+    query.add_argument('db')
+    query.add_argument('--type', help="VVOR (RVVO) or VORS (SRVO)")
+    query.add_argument('--uid')
+    query.add_argument('--from', dest='date_from', help="first date, YYYY-MM-DD")
+    query.add_argument('--to', dest='date_to', help="last date, YYYY-MM-DD")
+    query.add_argument('--min', type=_range, action='append', default=[], metavar='METRIC=VALUE')
+    query.add_argument('--max', type=_range, action='append', default=[], metavar='METRIC=VALUE')
+    query.add_argument('--limit', type=int)
+    query.add_argument('-o', '--output', help="write the matching tests to a CSV file")
+    args = parser.parse_args(argv)
+
+    with PatientDB(args.db) as db:
+        if args.command == 'ingest':
+            start = time.perf_counter()
+            added, retried, duplicates, skipped = db.ingest(args.exports, args.workers, args.force)
+            print(f"{added} test(s) added, {retried} retried, {duplicates} already stored, {skipped} unchanged export(s) "
+                  f"skipped in {time.perf_counter() - start:.1f} s ({len(db)} in total)", file=sys.stderr)
+            return
+        ranges = {}
+        for field, value in args.min:
+            ranges[field] = (value, ranges.get(field, (None, None))[1])
+        for field, value in args.max:
+            ranges[field] = (ranges.get(field, (None, None))[0], value)
+        start = time.perf_counter()
+        try:
+            rows = db.query(args.type, args.uid, args.date_from, args.date_to, ranges, limit=args.limit)
+        except ValueError as exc:
+            sys.exit(str(exc))
+        elapsed = time.perf_counter() - start
+        if args.output:
+            with open(args.output, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=QUERY_COLUMNS)
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            for row in rows:
+                print(f"{row['started'] or row['fecha']}  {row['test_type'] or '-':4}  uid {row['uid']:>8}  "
+                      f"AUC L {_number(row['gain_auc_L'])} R {_number(row['gain_auc_R'])}  "
+                      f"{os.path.basename(row['path'] or '')}")
+        print(f"{len(rows)} test(s) in {1e3 * elapsed:.1f} ms", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+# Opt-in per-stage timing of parsing, metrics and rendering
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+ENV_VAR = 'VVOR_PROFILE'  # set to 1 to record stages from startup
+
+
+class _NullStage:
+    """Returned by stage() while profiling is off: entering it costs one call."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **sizes):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, profiler, name, sizes):
+        self.profiler = profiler
+        self.name = name
+        self.sizes = sizes
+
+    def set(self, **sizes):
+        """Adds sizes only known once the stage has run (e.g. number of tests found)."""
+        self.sizes.update(sizes)
+
+    def __enter__(self):
+        local = self.profiler._local
+        self.depth = getattr(local, 'depth', 0)
+        local.depth = self.depth + 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.profiler._local.depth = self.depth
+        self.profiler.records.append({
+            'name': self.name,
+            'start': self.start,
+            'seconds': end - self.start,
+            'sizes': self.sizes,
+            'depth': self.depth,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+        })
+        return False
+
+
+class Profiler:
+    """
+    Collects one record per timed stage: name, start (perf_counter) and duration in
+    seconds, nesting depth, process/thread and the array sizes the stage worked on.
+    Disabled by default; while disabled, stage() returns a shared no-op context.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.records = []
+        self._local = threading.local()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def clear(self):
+        self.records = []
+
+    def drain(self):
+        """Returns the records collected so far and starts a new list."""
+        records, self.records = self.records, []
+        return records
+
+    def merge(self, records):
+        """Adds records collected by another process (e.g. a batch worker)."""
+        self.records.extend(records)
+
+    def stage(self, name, **sizes):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, sizes)
+
+    def summary(self):
+        """Per stage name: calls, total/mean/max seconds and the largest sizes seen, slowest first."""
+        stats = {}
+        for r in self.records:
+            s = stats.setdefault(r['name'], {'calls': 0, 'total': 0.0, 'max': 0.0, 'sizes': {}})
+            s['calls'] += 1
+            s['total'] += r['seconds']
+            s['max'] = max(s['max'], r['seconds'])
+            for key, value in r['sizes'].items():
+                s['sizes'][key] = max(s['sizes'].get(key, value), value)
+        for s in stats.values():
+            s['mean'] = s['total'] / s['calls']
+        return dict(sorted(stats.items(), key=lambda item: -item[1]['total']))
+
+    def format_summary(self):
+        lines = [f"{'stage':32} {'calls':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9}  sizes"]
+        for name, s in self.summary().items():
+            sizes = ', '.join(f"{k}={v}" for k, v in s['sizes'].items())
+            lines.append(f"{name:32} {s['calls']:6d} {1e3 * s['total']:10.2f} "
+                         f"{1e3 * s['mean']:9.2f} {1e3 * s['max']:9.2f}  {sizes}")
+        return '\n'.join(lines)
+
+    def _relative_records(self):
+        """Records with start times counted from the first recorded stage."""
+        origin = min((r['start'] for r in self.records), default=0.0)
+        return [dict(r, start=r['start'] - origin) for r in self.records]
+
+    def to_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'records': self._relative_records(), 'summary': self.summary()}, f, indent=1)
+
+    def to_chrome_trace(self, path):
+        """Trace Event Format, for chrome://tracing or Perfetto (complete events, µs)."""
+        events = [{
+            'name': r['name'], 'ph': 'X', 'cat': r['name'].split('.')[0],
+            'ts': r['start'] * 1e6, 'dur': r['seconds'] * 1e6,
+            'pid': r['pid'], 'tid': r['tid'], 'args': r['sizes'],
+        } for r in self._relative_records()]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def export(self, path, fmt=None):
+        """Writes JSON records, or a Chrome trace for fmt='chrome' or a path ending in .trace.json."""
+        if fmt == 'chrome' or (fmt is None and path.lower().endswith('.trace.json')):
+            self.to_chrome_trace(path)
+        else:
+            self.to_json(path)
+
+
+PROFILER = Profiler(enabled=os.environ.get(ENV_VAR, '') not in ('', '0'))
+
+
+def stage(name, **sizes):
+    """`with stage('metrics.fft', n=len(h)):` times the block when profiling is on."""
+    return PROFILER.stage(name, **sizes)
+
+
+def collect(fn, arg):
+    """
+    Runs fn(arg) with profiling on and returns (result, records); used as the
+    mapped function of process pools so worker timings reach the parent.
+    """
+    PROFILER.enable()
+    PROFILER.clear()
+    result = fn(arg)
+    return result, PROFILER.drain()
+
+
+@contextmanager
+def profiling_to(path, fmt=None):
+    """Enables profiling for the block and exports the records to `path` (if given) afterwards."""
+    if not path:
+        yield PROFILER
+        return
+    was_enabled = PROFILER.enabled
+    PROFILER.enable()
+    try:
+        yield PROFILER
+    finally:
+        PROFILER.enable(was_enabled)
+        PROFILER.export(path, fmt)
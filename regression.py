@@ -0,0 +1,56 @@
+# Closed-form least-squares gains with fit quality, from sums instead of np.polyfit
+import numpy as np
+from scipy.stats import t as student_t
+
+CONFIDENCE = 0.95
+
+NO_FIT = {'slope': np.nan, 'intercept': np.nan, 'r2': np.nan, 'slope_ci': np.nan, 'n': 0}
+
+
+def side_masks(h):
+    """Left (head velocity > 0) and right (< 0) sample masks, shared by metrics and plots."""
+    return h > 0, h < 0
+
+
+def _fit(n, mean_x, mean_y, sxx, sxy, syy):
+    """
+    Line y = slope * x + intercept from centred sums of squares and products.
+    slope_ci is the half width of the two-sided CONFIDENCE interval of the slope.
+    """
+    if n < 2 or sxx <= 0:
+        return dict(NO_FIT, n=n)
+    slope = sxy / sxx
+    intercept = mean_y - slope * mean_x
+    r2 = sxy * sxy / (sxx * syy) if syy > 0 else np.nan
+    slope_ci = np.nan
+    if n > 2:
+        residual = max(syy - slope * sxy, 0.0)
+        slope_ci = student_t.ppf(0.5 + CONFIDENCE / 2, n - 2) * np.sqrt(residual / (n - 2) / sxx)
+    return {'slope': slope, 'intercept': intercept, 'r2': r2, 'slope_ci': slope_ci, 'n': n}
+
+
+def linear_fit(x, y):
+    """Least-squares line of y on x, same slope and intercept as np.polyfit(x, y, 1)."""
+    n = len(x)
+    if n < 2 or len(y) != n:
+        return dict(NO_FIT, n=n)
+    mean_x, mean_y = np.mean(x), np.mean(y)
+    dx, dy = x - mean_x, y - mean_y
+    return _fit(n, mean_x, mean_y, np.dot(dx, dx), np.dot(dx, dy), np.dot(dy, dy))
+
+
+def fit_from_sums(n, sx, sy, sxx, sxy, syy):
+    """linear_fit from raw sums (Σx, Σy, Σx², Σxy, Σy²), e.g. prefix-sum differences."""
+    if n < 2:
+        return dict(NO_FIT, n=n)
+    return _fit(n, sx / n, sy / n, sxx - sx * sx / n, sxy - sx * sy / n, syy - sy * sy / n)
+
+
+def fit_metrics(fit_L, fit_R):
+    """Metrics dict entries of the left and right fits."""
+    return {
+        "m_pos": fit_L['slope'], "m_neg": fit_R['slope'],
+        "b_pos": fit_L['intercept'], "b_neg": fit_R['intercept'],
+        "r2_pos": fit_L['r2'], "r2_neg": fit_R['r2'],
+        "m_pos_ci": fit_L['slope_ci'], "m_neg_ci": fit_R['slope_ci'],
+    }
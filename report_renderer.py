@@ -0,0 +1,212 @@
+# Headless rendering of the six-plot report figure, one test or a whole export
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from analysis_calculations import calculate_all_metrics
+from analysis_plots import update_six_plots
+from metrics_cache import METRICS_CACHE, metrics_key
+from profiling import PROFILER, collect, profiling_to, stage
+from test_loader import iter_export_tests, detect_test_type, test_identity
+
+DPI = 300
+FIGSIZE = (16.5, 13)
+DEFAULT_CHUNKSIZE = 2
+
+
+def summary_text(t, h, metrics):
+    """Summary printed under the report figure for the window t, h."""
+    if not np.isnan(metrics['maxFreqHeadFour']):
+        freq_str = f"Dominant Head Freq: {metrics['maxFreqHeadFour']:.2f} Hz\n"
+    else:
+        freq_str = "Dominant Head Freq: - Hz\n"
+    return (
+        f"Time window: {t[0]:.2f}–{t[-1]:.2f} s (Δt = {t[-1]-t[0]:.2f} s)\n"
+        f"Max Head Vel: {np.nanmax(np.abs(h)):.2f} °/s | "
+        f"Max Eye Vel: {np.nanmax(np.abs(metrics['desac_e'])):.2f} °/s\n"
+        f"Mean Peak Head Vel: {metrics['mean_peak_head']:.2f} ± {metrics['std_peak_head']:.2f} °/s\n"
+        f"{freq_str}"
+        f"SPI Head: {metrics['spi_h']:.2f} | Eye: {metrics['spi_e']:.2f}   SNR Head: {metrics['snr_h']:.1f} dB | Eye: {metrics['snr_e']:.1f} dB\n"
+        f"Gain (slope) L: {metrics['m_pos']:.2f} | R: {metrics['m_neg']:.2f}   "
+        f"AUC Gain L: {metrics['gain_auc_L']:.2f} | R: {metrics['gain_auc_R']:.2f}   "
+        f"Fourier Gain L: {metrics['leftFouGain']:.2f} | R: {metrics['rightFouGain']:.2f}\n"
+        f"PR Score: L = {metrics['lPR']} | R = {metrics['rPR']}"
+    )
+
+
+class ReportRenderer:
+    """
+    3x2 report figure on the Agg canvas, independent of pyplot and Tk. The figure,
+    its axes and text artists are built once and redrawn for every test.
+    """
+
+    def __init__(self, dpi=DPI):
+        self.dpi = dpi
+        self.fig = Figure(figsize=FIGSIZE)
+        FigureCanvasAgg(self.fig)
+        self.axs = self.fig.subplots(3, 2)
+        self.fig.subplots_adjust(hspace=0.38, wspace=0.22, top=0.90, bottom=0.16)
+        self.title = self.fig.suptitle("", fontsize=14, fontweight='bold')
+        self.summary = self.fig.text(0.5, 0.005, "", ha='center', fontsize=12, color="#222", wrap=True)
+
+    def draw(self, t, e, h, s, metrics, plot4="Fourier Gain", title=""):
+        with stage('render.report_draw', n=len(t)):
+            for ax in self.axs.flat:
+                ax.clear()
+            update_six_plots(self.axs, t, e, h, s, metrics, lod_dpi=self.dpi, plot4=plot4)
+            self.title.set_text(title)
+            self.summary.set_text(summary_text(t, h, metrics))
+        return self.fig
+
+    def save(self, path_or_pdf):
+        """Writes the current figure to an image path or as a page of an open PdfPages."""
+        with stage('render.report_save', dpi=self.dpi):
+            if isinstance(path_or_pdf, PdfPages):
+                path_or_pdf.savefig(self.fig, dpi=self.dpi)
+            else:
+                self.fig.savefig(path_or_pdf, dpi=self.dpi)
+
+
+def load_test_metrics(test, cached=True):
+    """
+    Samples, type and full-recording metrics of a test; ValueError if it cannot be
+    analyzed. cached=False bypasses METRICS_CACHE (bulk runs that see each test once).
+    """
+    if test['dec_sep'] is None:
+        raise ValueError("<DecimalSeparator> not found or incomplete block.")
+    s = detect_test_type(test['tipo'])
+    if s is None:
+        raise ValueError(f"Test type not supported: {test['tipo']}")
+    t, e, h = test.channels(keep=False)
+    if len(t) == 0:
+        raise ValueError("No valid numeric data found in test block.")
+    if not cached:
+        return t, e, h, s, calculate_all_metrics(t, e, h, s)
+    key = metrics_key(test_identity(test), t[0], t[-1], s)
+    metrics = METRICS_CACHE.get_or_compute(key, lambda: calculate_all_metrics(t, e, h, s))
+    return t, e, h, s, metrics
+
+
+def test_title(test):
+    return f"{test['fecha']} | {test['tipo']}"
+
+
+def report_filename(index, test):
+    name = re.sub(r'[^\w.-]+', '_', f"{test['fecha']}_{test['tipo']}").strip('_')
+    return f"{index:03d}_{test['uid']}_{name}.png"
+
+
+# One renderer per worker process, reused for every test it is sent
+_renderer = None
+
+
+def _get_renderer(dpi):
+    global _renderer
+    if _renderer is None or _renderer.dpi != dpi:
+        _renderer = ReportRenderer(dpi)
+    return _renderer
+
+
+def _render_png(job):
+    test, path, dpi = job
+    start = time.perf_counter()
+    try:
+        t, e, h, s, metrics = load_test_metrics(test, cached=False)
+        renderer = _get_renderer(dpi)
+        renderer.draw(t, e, h, s, metrics, title=test_title(test))
+        renderer.save(path)
+    except Exception as exc:
+        return path, time.perf_counter() - start, f"{type(exc).__name__}: {exc}"
+    return path, time.perf_counter() - start, ''
+
+
+def _load_for_pdf(test):
+    start = time.perf_counter()
+    try:
+        return load_test_metrics(test, cached=False), time.perf_counter() - start, ''
+    except Exception as exc:
+        return None, time.perf_counter() - start, f"{type(exc).__name__}: {exc}"
+
+
+def _map(fn, jobs, workers, chunksize):
+    if workers == 1:
+        yield from map(fn, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if not PROFILER.enabled:
+            yield from pool.map(fn, jobs, chunksize=chunksize)
+            return
+        # Worker stage timings travel back with each result
+        for result, records in pool.map(partial(collect, fn), jobs, chunksize=chunksize):
+            PROFILER.merge(records)
+            yield result
+
+
+def _log(test, seconds, error):
+    label = f"{os.path.basename(test['path'])} [{test['uid']}] {test_title(test)}"
+    if error:
+        print(f"{label}: {error}", file=sys.stderr)
+    else:
+        print(f"{label}: {seconds:.2f} s", file=sys.stderr)
+
+
+def render_reports(paths, output, workers=None, dpi=DPI, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Renders the report figure of every test in the exports `paths`.
+    An output ending in .pdf becomes one multi-page PDF, anything else a directory
+    of PNG files. Returns the number of pages written.
+    PNG reports are rendered entirely in the worker processes; for a PDF the workers
+    compute the metrics and the pages are drawn here, in order, into one document.
+    """
+    tests = [test for path in paths for test in iter_export_tests(path)]
+    written = 0
+    if output.lower().endswith('.pdf'):
+        renderer = ReportRenderer(dpi)
+        with PdfPages(output) as pdf:
+            for test, (loaded, seconds, error) in zip(tests, _map(_load_for_pdf, tests, workers, chunksize)):
+                if not error:
+                    start = time.perf_counter()
+                    try:
+                        renderer.draw(*loaded, title=test_title(test))
+                        renderer.save(pdf)
+                        written += 1
+                    except Exception as exc:
+                        error = f"{type(exc).__name__}: {exc}"
+                    seconds += time.perf_counter() - start
+                _log(test, seconds, error)
+        return written
+
+    os.makedirs(output, exist_ok=True)
+    jobs = [(test, os.path.join(output, report_filename(i, test)), dpi) for i, test in enumerate(tests, 1)]
+    for test, (_, seconds, error) in zip(tests, _map(_render_png, jobs, workers, chunksize)):
+        written += not error
+        _log(test, seconds, error)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the six-plot report of every test in one or more exports.")
+    parser.add_argument('exports', nargs='+', help="export .txt files or .vvb binary caches")
+    parser.add_argument('-o', '--output', required=True, help="output .pdf file, or a directory for PNG files")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="worker processes (default: one per CPU, 1 = no pool)")
+    parser.add_argument('--dpi', type=int, default=DPI, help="resolution of the figures")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="write per-stage timings to PATH (.trace.json for a Chrome trace)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with profiling_to(args.profile):
+        written = render_reports(args.exports, args.output, args.workers, args.dpi)
+    print(f"{written} report(s) written to {args.output} in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# Fast launch of the GUI: the analysis stack is imported in the background and timed
+import importlib
+import sys
+import threading
+import time
+
+STARTED = time.perf_counter()  # main.py imports this module first
+ENV_VAR = 'VVOR_STARTUP_REPORT'  # set to 1 to print the startup report
+
+# What the first analysis needs, in import order; NumPy, SciPy and matplotlib make up
+# most of it and none of it is needed to show the test list
+PRELOAD = (
+    'numpy',
+    'scipy.signal',
+    'scipy.stats',
+    'matplotlib.pyplot',
+    'matplotlib.backends.backend_tkagg',
+    'analysis',
+    'comparison_window',
+    'batch_analysis',
+)
+
+
+class Startup:
+    """
+    Timeline of the launch (marks on the Tk thread) and of the background preload
+    (one entry per module of PRELOAD). The report is printed to stderr once both
+    the window is usable and the preload is over, if requested.
+    """
+
+    def __init__(self, report=False):
+        self.report = report
+        self.marks = []  # (name, seconds since launch)
+        self.imports = []  # (module, seconds, modules loaded, error)
+        self.preload_span = None  # (start, end) in seconds since launch
+        self._ready = False
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - STARTED))
+
+    def ready(self):
+        """The window is drawn and the event loop is running."""
+        self.mark('window ready')
+        with self._lock:
+            self._ready = True
+        self._maybe_report()
+
+    def preload(self, modules=PRELOAD):
+        """Imports `modules` on a daemon thread; it never touches Tk."""
+        self._thread = threading.Thread(target=self._preload, args=(modules,), name='vvor-preload', daemon=True)
+        self._thread.start()
+
+    def _preload(self, modules):
+        start = time.perf_counter()
+        for name in modules:
+            loaded = len(sys.modules)
+            t0 = time.perf_counter()
+            error = None
+            try:
+                importlib.import_module(name)
+            except Exception as exc:  # the first analysis reports it again, on the Tk thread
+                error = f"{type(exc).__name__}: {exc}"
+            self.imports.append((name, time.perf_counter() - t0, len(sys.modules) - loaded, error))
+        with self._lock:
+            self.preload_span = (start - STARTED, time.perf_counter() - STARTED)
+        self._maybe_report()
+
+    def _maybe_report(self):
+        with self._lock:
+            if not self.report or not self._ready or (self._thread is not None and self.preload_span is None):
+                return
+            self.report = False  # print once
+        print(self.format_report(), file=sys.stderr)
+
+    def format_report(self):
+        lines = ["startup: ms since launch | event"]
+        for name, at in self.marks:
+            lines.append(f"{1e3 * at:9.1f} | {name}")
+        if self.preload_span is not None:
+            start, end = self.preload_span
+            lines.append(f"preload (background, {1e3 * start:.1f} → {1e3 * end:.1f} ms): ms | new modules | module")
+            for name, seconds, loaded, error in self.imports:
+                lines.append(f"{1e3 * seconds:9.1f} | {loaded:11d} | {name}" + (f"  ({error})" if error else ""))
+        return '\n'.join(lines)
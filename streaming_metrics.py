@@ -0,0 +1,326 @@
+# Rolling-window VVOR metrics for recordings that are still being acquired
+import argparse
+import socket
+import sys
+import time
+from collections import deque
+import numpy as np
+from scipy.signal import find_peaks
+from block_decoder import N_COLS, decode_numeric_block
+from desaccade import DesaccadeFilter, desaccade_kernel
+from fft_utils import amplitude_spectra
+from regression import fit_from_sums, fit_metrics, side_masks
+
+Fs = 250  # Hz
+DEFAULT_WINDOW_S = 30
+STEP = 1024  # samples handled per internal update, bounds the work of one push
+SPECTRUM_EVERY_S = 1.0  # the dominant head frequency is refreshed at most this often
+_SUMS = ('x', 'y', 'ay', 'xx', 'xy', 'yy')
+
+
+class RingBuffer:
+    """
+    Fixed-capacity buffer of the newest rows of a stream. Rows are kept twice as
+    deep as the capacity so the newest `capacity` rows are always one contiguous
+    view; the occasional compaction copies `capacity` rows.
+    Rows are addressed by their global index in the stream.
+    """
+
+    def __init__(self, capacity, n_cols, dtype=np.float64):
+        self.capacity = capacity
+        self._data = np.empty((2 * capacity, n_cols), dtype=dtype)
+        self._start = 0  # position of the oldest row kept
+        self._end = 0
+        self.total = 0  # rows appended since the start of the stream
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def first(self):
+        """Global index of the oldest row still available."""
+        return self.total - len(self)
+
+    def extend(self, rows):
+        n = len(rows)
+        rows = rows[-self.capacity:]
+        if self._end + len(rows) > len(self._data):
+            keep = min(len(self), self.capacity - len(rows))
+            self._data[:keep] = self._data[self._end - keep:self._end]
+            self._start, self._end = 0, keep
+        self._data[self._end:self._end + len(rows)] = rows
+        self._end += len(rows)
+        self._start = max(self._start, self._end - self.capacity)
+        self.total += n
+
+    def rows(self, lo, hi):
+        """View of the rows with global indices [lo, hi), which must still be buffered."""
+        if lo < self.first or hi > self.total:
+            raise IndexError(f"rows {lo}:{hi} not buffered ({self.first}:{self.total})")
+        offset = self._end - self.total
+        return self._data[lo + offset:hi + offset]
+
+
+class StreamingAnalyzer:
+    """
+    Incremental AUC gain, regression gain, dominant head frequency and saccade/PR
+    statistics over the trailing `window_s` seconds of a sample stream.
+
+    Chunks of rows in the 9-column export layout are pushed as they arrive. The
+    desaccade filter (moving average by default, as in calculate_all_metrics) runs
+    chunk by chunk; each sample is final once (kernel - 1) // 2 newer samples have
+    arrived, and is then
+    added to per-side running sums, which are subtracted again when the sample
+    leaves the window. Saccades are searched once per completed head half cycle.
+    Memory is bounded by the window and each push costs O(chunk + kernel).
+    Values match calculate_all_metrics on the same samples except through the
+    samples within a kernel of the window edges, where the batch filter sees zero
+    padding: the gains and slopes of a side with samples there differ by up to
+    about 1e-4 relative over a 1000 s window and 1e-2 over a 10 s one.
+    """
+
+    def __init__(self, s=0, window_s=DEFAULT_WINDOW_S, spectrum_every_s=SPECTRUM_EVERY_S, method='mean'):
+        self.s = s
+        self.window = int(round(window_s * Fs))
+        self.spectrum_every = int(round(spectrum_every_s * Fs))
+        self.desac_filter = DesaccadeFilter(desaccade_kernel(s), method)
+        # t, h, e, desaccaded e
+        self.buffer = RingBuffer(self.window + self.desac_filter.kernel + STEP, 4)
+        self.t0 = None
+        self.final = 0  # samples whose desaccaded value is known
+        self.win_start = 0  # first sample of the window of final samples
+        self.sums = {side: dict.fromkeys(('n',) + _SUMS, 0.0) for side in 'LR'}
+        self.half_cycle_start = None  # first sample of the current head half cycle
+        self.latencies = deque()  # (start index, latency, left side, peak time)
+        self._spectrum = (np.nan, -1)
+        self._since_resync = 0
+        self.last_push_s = 0.0
+
+    # ---------- input ----------
+    def push(self, rows):
+        """Adds decoded (n, 9) rows; returns the number of rows taken."""
+        start = time.perf_counter()
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, N_COLS)
+        if len(rows) and self.t0 is None:
+            self.t0 = rows[0, 0]
+        for lo in range(0, len(rows), STEP):
+            chunk = rows[lo:lo + STEP]
+            block = np.empty((len(chunk), 4))
+            block[:, 0] = (chunk[:, 0] - self.t0) / 10000000  # same seconds as TestRecord.channels
+            block[:, 1] = chunk[:, 1]
+            block[:, 2] = chunk[:, 2]
+            block[:, 3] = np.nan
+            first = self.buffer.total
+            self.buffer.extend(block)
+            self._half_cycles(first)
+            self._finalize(self.desac_filter.process(block[:, 2]))
+        self.last_push_s = time.perf_counter() - start
+        return len(rows)
+
+    def _finalize(self, desac):
+        if len(desac) == 0:
+            return
+        new = self.buffer.rows(self.final, self.final + len(desac))
+        new[:, 3] = desac
+        self._add(new, 1)
+        self.final += len(desac)
+        # Slide the window over the final samples
+        new_start = max(self.win_start, self.final - self.window)
+        if new_start > self.win_start:
+            self._add(self.buffer.rows(self.win_start, new_start), -1)
+            self.win_start = new_start
+        self._since_resync += len(new)
+        if self._since_resync >= self.window:
+            self._resync()
+
+    def _add(self, rows, sign):
+        h, d = rows[:, 1], rows[:, 3]
+        for side, mask in zip('LR', side_masks(h)):
+            x, y = h[mask], d[mask]
+            S = self.sums[side]
+            S['n'] += sign * len(x)
+            S['x'] += sign * np.sum(x)
+            S['y'] += sign * np.sum(y)
+            S['ay'] += sign * np.sum(np.abs(y))
+            S['xx'] += sign * np.sum(x * x)
+            S['xy'] += sign * np.sum(x * y)
+            S['yy'] += sign * np.sum(y * y)
+
+    def _resync(self):
+        """Recomputes the running sums from the buffer, so rounding never accumulates."""
+        self.sums = {side: dict.fromkeys(('n',) + _SUMS, 0.0) for side in 'LR'}
+        self._add(self.buffer.rows(self.win_start, self.final), 1)
+        self._since_resync = 0
+
+    def _half_cycles(self, first):
+        if self.s == 1:
+            return  # VORS: no saccade latencies, as in the batch PR score
+        buf = self.buffer
+        lo = max(first - 1, buf.first)
+        rows = buf.rows(lo, buf.total)
+        pos = rows[:, 1] > 0
+        crossings = np.flatnonzero(pos[1:] != pos[:-1]) + 1 + lo
+        for cross in crossings:
+            start = self.half_cycle_start
+            self.half_cycle_start = cross
+            if start is None or start < buf.first:
+                continue  # began before the stream or the buffer
+            seg = buf.rows(start, cross)
+            if len(seg) < 4 or np.max(np.abs(seg[:, 1])) < 15:
+                continue
+            peaks, _ = find_peaks(np.abs(seg[:, 2]), height=180, prominence=130, width=(None, 20))
+            if len(peaks) > 0:
+                latency = seg[peaks[0], 0] - seg[0, 0]
+                self.latencies.append((start, latency, seg[0, 1] > 0, seg[peaks[0], 0]))
+        while self.latencies and self.latencies[0][0] < buf.total - self.window:
+            self.latencies.popleft()
+
+    # ---------- output ----------
+    def _auc_and_fit(self, side, h, d):
+        S = self.sums[side]
+        n = int(round(S['n']))
+        fit = fit_from_sums(n, S['x'], S['y'], S['xx'], S['xy'], S['yy'])
+        gain = np.nan
+        if n <= 1:
+            return gain, fit
+        mask = h > 0 if side == 'L' else h < 0
+        first, last = np.argmax(mask), len(mask) - 1 - np.argmax(mask[::-1])
+        h0, h1, e0, e1 = h[first], h[last], d[first], d[last]
+        head = S['x'] - (h0 + h1) / 2
+        if np.abs(head) > 0:
+            if side == 'L':
+                gain = (S['y'] - (e0 + e1) / 2) / head
+            else:
+                gain = (S['ay'] - (abs(e0) + abs(e1)) / 2) / -head
+        return gain, fit
+
+    def _dominant_frequency(self, h):
+        value, at = self._spectrum
+        if at < 0 or self.final - at >= self.spectrum_every:
+            value = np.nan
+            if len(h) > 1:
+                f, P1 = amplitude_spectra(h, Fs)
+                value = f[np.argmax(P1[0])]
+            self._spectrum = (value, self.final)
+        return value
+
+    def _pr(self, left):
+        lat = np.array([l for _, l, is_left, _ in self.latencies if is_left == left])
+        if self.s == 1 or len(lat) <= 3 or np.mean(lat) == 0:
+            return np.nan
+        return min(round(np.std(lat) / np.mean(lat) * 100), 100)
+
+    def metrics(self):
+        """Metrics of the current window, with the same keys as calculate_all_metrics."""
+        window = self.buffer.rows(self.win_start, self.final)
+        t, h, d = window[:, 0], window[:, 1], window[:, 3]
+        gain_auc_L, fit_L = self._auc_and_fit('L', h, d)
+        gain_auc_R, fit_R = self._auc_and_fit('R', h, d)
+        metrics = {
+            "t_start": t[0] if len(t) else np.nan,
+            "t_end": t[-1] if len(t) else np.nan,
+            "samples": len(t),
+            "gain_auc_L": gain_auc_L, "gain_auc_R": gain_auc_R,
+            "maxFreqHeadFour": self._dominant_frequency(h),
+            "lPR": self._pr(True), "rPR": self._pr(False),
+            "saccades": [peak for *_, peak in self.latencies],
+        }
+        metrics.update(fit_metrics(fit_L, fit_R))
+        return metrics
+
+
+# ---------- sources ----------
+class _LineSplitter:
+    """Turns arbitrary byte chunks into decoded rows, holding back a partial last line."""
+
+    def __init__(self, list_sep=';', dec_sep=','):
+        self.list_sep, self.dec_sep = list_sep, dec_sep
+        self._tail = b''
+
+    def feed(self, data):
+        data = self._tail + data
+        cut = data.rfind(b'\n') + 1
+        self._tail = data[cut:]
+        if not cut:
+            return np.empty((0, N_COLS))
+        rows, _ = decode_numeric_block(data[:cut], self.list_sep, self.dec_sep)
+        return rows
+
+
+def iter_stream_chunks(stream, list_sep=';', dec_sep=',', chunk_size=65536):
+    """Decoded rows from a binary stream (pipe, socket file, stdin) until it closes."""
+    splitter = _LineSplitter(list_sep, dec_sep)
+    while True:
+        data = stream.read1(chunk_size) if hasattr(stream, 'read1') else stream.read(chunk_size)
+        if not data:
+            return
+        rows = splitter.feed(data)
+        if len(rows):
+            yield rows
+
+
+def iter_file_chunks(path, list_sep=';', dec_sep=',', poll_s=0.2, idle_timeout_s=None):
+    """
+    Decoded rows appended to a file that is still being written (like tail -f).
+    Header lines and other non-numeric rows are skipped by the decoder. Stops after
+    idle_timeout_s seconds without new data, or never if it is None.
+    """
+    splitter = _LineSplitter(list_sep, dec_sep)
+    idle = 0.0
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read()
+            if data:
+                idle = 0.0
+                rows = splitter.feed(data)
+                if len(rows):
+                    yield rows
+                continue
+            if idle_timeout_s is not None and idle >= idle_timeout_s:
+                return
+            time.sleep(poll_s)
+            idle += poll_s
+
+
+def iter_socket_chunks(host, port, list_sep=';', dec_sep=','):
+    """Decoded rows sent by an acquisition process over a local TCP connection."""
+    with socket.create_connection((host, port)) as sock:
+        yield from iter_stream_chunks(sock.makefile('rb'), list_sep, dec_sep)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print rolling-window VVOR metrics of a live recording.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--follow', metavar='FILE', help="text file being appended to")
+    source.add_argument('--connect', metavar='HOST:PORT', help="local socket sending sample rows")
+    source.add_argument('--stdin', action='store_true', help="read sample rows from a pipe")
+    parser.add_argument('--type', choices=('VVOR', 'VORS'), default='VVOR')
+    parser.add_argument('--window', type=float, default=DEFAULT_WINDOW_S, help="trailing window in seconds")
+    parser.add_argument('--every', type=float, default=1.0, help="seconds between printed updates")
+    parser.add_argument('--list-sep', default=';')
+    parser.add_argument('--dec-sep', default=',')
+    args = parser.parse_args(argv)
+
+    seps = dict(list_sep=args.list_sep, dec_sep=args.dec_sep)
+    if args.follow:
+        chunks = iter_file_chunks(args.follow, **seps)
+    elif args.connect:
+        host, port = args.connect.rsplit(':', 1)
+        chunks = iter_socket_chunks(host, int(port), **seps)
+    else:
+        chunks = iter_stream_chunks(sys.stdin.buffer, **seps)
+
+    analyzer = StreamingAnalyzer(s=int(args.type == 'VORS'), window_s=args.window)
+    next_print = 0.0
+    for rows in chunks:
+        analyzer.push(rows)
+        m = analyzer.metrics()
+        if m['samples'] and m['t_end'] >= next_print:
+            next_print = m['t_end'] + args.every
+            print(f"{m['t_start']:8.2f}–{m['t_end']:8.2f} s | AUC L {m['gain_auc_L']:.2f} R {m['gain_auc_R']:.2f} | "
+                  f"slope L {m['m_pos']:.2f} R {m['m_neg']:.2f} | head {m['maxFreqHeadFour']:.2f} Hz | "
+                  f"PR L {m['lPR']} R {m['rPR']} | {analyzer.last_push_s * 1e3:.1f} ms/chunk", flush=True)
+
+
+if __name__ == '__main__':
+    main()
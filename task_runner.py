@@ -0,0 +1,124 @@
+# Worker thread for parsing and metric computation, with results delivered on the Tk thread
+from collections import OrderedDict
+import queue
+import threading
+import time
+
+POLL_MS = 25  # interval of the Tk-side polling while jobs are outstanding
+POLL_BUDGET = 0.03  # seconds of callbacks per Tk event-loop turn
+
+
+class Superseded(Exception):
+    """Raised inside a job's progress() once a newer job was submitted on its channel."""
+
+
+class TaskRunner:
+    """
+    Runs jobs on one background thread and hands their results back to Tk through
+    after() polling, so callbacks may touch widgets freely.
+    Jobs are grouped by channel: submitting on a channel replaces its queued job
+    and discards the result of the one running, so rapid clicks coalesce into one
+    computation of the latest request. Jobs never touch Tk themselves.
+    """
+
+    def __init__(self, widget, poll_ms=POLL_MS):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()  # channel -> job
+        self._latest = {}  # channel -> generation of its newest job
+        self._running = None
+        self._results = queue.SimpleQueue()
+        self._polling = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._work, name='vvor-worker', daemon=True)
+        self._thread.start()
+
+    def submit(self, channel, fn, on_done, on_error=None, on_progress=None):
+        """
+        Queues fn() on the worker; on_done(result) or on_error(exc) then run on the Tk
+        thread unless a newer job was submitted on the same channel meanwhile.
+        With on_progress, fn is called as fn(progress): each progress(value) is
+        delivered to on_progress(value) in order, and raises Superseded once the
+        job is obsolete so long loops stop early.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            generation = self._latest.get(channel, 0) + 1
+            self._latest[channel] = generation
+            self._pending.pop(channel, None)
+            self._pending[channel] = (channel, generation, fn, on_done, on_error, on_progress)
+            self._cond.notify()
+        self._schedule_poll()
+
+    def cancel(self, channel):
+        """Drops the queued job of a channel and ignores the result of its running one."""
+        with self._cond:
+            self._latest[channel] = self._latest.get(channel, 0) + 1
+            self._pending.pop(channel, None)
+
+    def busy(self, channel=None):
+        with self._cond:
+            if channel is None:
+                return bool(self._pending) or self._running is not None
+            return channel in self._pending or self._running == channel
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._cond.notify()
+
+    def _is_current(self, channel, generation):
+        with self._cond:
+            return self._latest.get(channel) == generation
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                _, job = self._pending.popitem(last=False)
+                channel, generation, fn, on_done, on_error, on_progress = job
+                self._running = channel
+            try:
+                if on_progress is None:
+                    result = fn()
+                else:
+                    def progress(value):
+                        if not self._is_current(channel, generation):
+                            raise Superseded()
+                        self._results.put((channel, generation, on_progress, value))
+                    result = fn(progress)
+                self._results.put((channel, generation, on_done, result))
+            except Superseded:
+                pass
+            except Exception as exc:
+                if on_error is not None:
+                    self._results.put((channel, generation, on_error, exc))
+            finally:
+                with self._cond:
+                    self._running = None
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        if self._closed:
+            return
+        deadline = time.perf_counter() + POLL_BUDGET
+        while time.perf_counter() < deadline:
+            try:
+                channel, generation, callback, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if self._is_current(channel, generation):
+                callback(value)
+        if self.busy() or not self._results.empty():
+            self._schedule_poll()
@@ -0,0 +1,251 @@
+# Searchable, sortable test list that only draws the rows on screen
+import tkinter as tk
+from tkinter import ttk
+from test_loader import parse_start, test_type_name
+
+ROW_HEIGHT = 20
+COLUMNS = (  # key, title, width in pixels
+    ('order', '#', 60),
+    ('started', 'Date', 160),
+    ('type', 'Type', 60),
+    ('tipo', 'Test', 230),
+    ('uid', 'UID', 90),
+)
+
+
+def _uid_key(uid):
+    return (0, int(uid), '') if uid.isdigit() else (1, 0, uid)
+
+
+class TestIndex:
+    """
+    In-memory index of the tests of an export: display values, a lowercase search
+    text and a sort key per column, built once per test as it is added.
+    filter() and sort() work on positions in self.tests and never touch Tk.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def __len__(self):
+        return len(self.tests)
+
+    def clear(self):
+        self.tests = []
+        self.values = []  # display values per test, in COLUMNS order
+        self.search = []  # lowercase text matched by the search box
+        self.keys = {key: [] for key, _, _ in COLUMNS}
+
+    def add(self, test):
+        n = len(self.tests)
+        uid = str(test.get('uid', ''))
+        started = parse_start(test.get('fecha', ''))
+        kind = test_type_name(test.get('tipo')) or '-'
+        self.tests.append(test)
+        self.values.append((str(n + 1), started or test.get('fecha', ''), kind, test.get('tipo', ''), uid))
+        self.search.append(f"{uid} {test.get('fecha', '')} {test.get('tipo', '')} {test.get('guid') or ''}".lower())
+        k = self.keys
+        k['order'].append(n)
+        k['started'].append((started is None, started or ''))
+        k['type'].append(kind)
+        k['tipo'].append(test.get('tipo', '').lower())
+        k['uid'].append(_uid_key(uid))
+
+    def filter(self, text='', kind=None, date_from=None, date_to=None):
+        """
+        Positions of the tests matching all filters: every word of `text` found in
+        the UID, date, type or GUID; kind 'VVOR'/'VORS'; ISO dates, both inclusive.
+        """
+        words = text.lower().split()
+        date_to = date_to + ' 23:59:59' if date_to and len(date_to) <= 10 else date_to
+        started = self.keys['started']
+        kinds = self.keys['type']
+        rows = []
+        for i, haystack in enumerate(self.search):
+            if kind and kinds[i] != kind:
+                continue
+            if date_from or date_to:
+                missing, date = started[i]
+                if missing or (date_from and date < date_from) or (date_to and date > date_to):
+                    continue
+            if all(w in haystack for w in words):
+                rows.append(i)
+        return rows
+
+    def sort(self, rows, column, reverse=False):
+        key = self.keys[column]
+        return sorted(rows, key=key.__getitem__, reverse=reverse)
+
+
+class TestTable(tk.Frame):
+    """
+    Virtualized multi-column list: whatever the number of rows, only the visible
+    ones are drawn on a canvas. Click a header to sort (again to reverse); click,
+    Ctrl+click and Shift+click select; double-click or Enter calls on_activate(i)
+    with the position of the test in the index.
+    """
+
+    def __init__(self, master, index, on_activate=None, height=12, **kwargs):
+        super().__init__(master, **kwargs)
+        self.index = index
+        self.on_activate = on_activate
+        self.rows = []
+        self.top = 0
+        self.selected = set()
+        self.anchor = None  # where Shift+click ranges start
+        self.cursor = None  # last clicked or moved-to test
+        self.sort_column, self.sort_reverse = 'order', False
+        width = sum(w for _, _, w in COLUMNS)
+
+        header = tk.Frame(self)
+        header.grid(row=0, column=0, sticky='ew')
+        self.header_buttons = {}
+        x = 0
+        for key, title, w in COLUMNS:
+            button = tk.Button(header, text=title, anchor='w', relief=tk.GROOVE, padx=4,
+                               command=lambda k=key: self.sort_by(k))
+            button.place(x=x, y=0, width=w, height=ROW_HEIGHT + 4)
+            self.header_buttons[key] = button
+            x += w
+        header.config(width=width, height=ROW_HEIGHT + 4)
+
+        self.canvas = tk.Canvas(self, width=width, height=height * ROW_HEIGHT, bg='white',
+                                highlightthickness=1, takefocus=1)
+        self.canvas.grid(row=1, column=0, sticky='nsew')
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.grid(row=1, column=1, sticky='ns')
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        c = self.canvas
+        c.bind('<Configure>', lambda e: self.render())
+        c.bind('<Button-1>', self._on_click)
+        c.bind('<Double-Button-1>', self._on_double_click)
+        c.bind('<MouseWheel>', lambda e: self.yview('scroll', -1 if e.delta > 0 else 1, 'units'))
+        c.bind('<Button-4>', lambda e: self.yview('scroll', -1, 'units'))
+        c.bind('<Button-5>', lambda e: self.yview('scroll', 1, 'units'))
+        c.bind('<Up>', lambda e: self._move(-1, e))
+        c.bind('<Down>', lambda e: self._move(1, e))
+        c.bind('<Prior>', lambda e: self.yview('scroll', -1, 'pages'))
+        c.bind('<Next>', lambda e: self.yview('scroll', 1, 'pages'))
+        c.bind('<Return>', lambda e: self._activate(self.cursor))
+        c.bind('<Control-a>', lambda e: self.select_all())
+
+    # ---------- data ----------
+    def set_rows(self, rows):
+        """Shows the index positions `rows`, in the current sort order."""
+        self.rows = self.index.sort(rows, self.sort_column, self.sort_reverse)
+        self.top = min(self.top, max(len(self.rows) - self.visible_rows(), 0))
+        self.render()
+
+    def sort_by(self, column):
+        if column == self.sort_column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column, self.sort_reverse = column, False
+        for key, title, _ in COLUMNS:
+            mark = (' ▼' if self.sort_reverse else ' ▲') if key == column else ''
+            self.header_buttons[key].config(text=title + mark)
+        self.set_rows(self.rows)
+
+    def selection(self):
+        """Selected index positions, in display order."""
+        return [i for i in self.rows if i in self.selected]
+
+    def select_all(self):
+        self.selected = set(self.rows)
+        self.render()
+
+    def clear_selection(self):
+        self.selected.clear()
+        self.anchor = self.cursor = None
+        self.render()
+
+    # ---------- scrolling ----------
+    def visible_rows(self):
+        return max(self.canvas.winfo_height() // ROW_HEIGHT, 1)
+
+    def yview(self, *args):
+        n, visible = len(self.rows), self.visible_rows()
+        if args and args[0] == 'moveto':
+            self.top = int(float(args[1]) * n)
+        elif args and args[0] == 'scroll':
+            step = int(args[1]) * (visible if args[2] == 'pages' else 1)
+            self.top += step
+        self.top = max(0, min(self.top, n - visible))
+        self.render()
+
+    def see(self, row):
+        visible = self.visible_rows()
+        if row < self.top:
+            self.top = row
+        elif row >= self.top + visible:
+            self.top = row - visible + 1
+        self.render()
+
+    def render(self):
+        c = self.canvas
+        c.delete('all')
+        n, visible = len(self.rows), self.visible_rows()
+        width = max(c.winfo_width(), sum(w for _, _, w in COLUMNS))
+        for r in range(self.top, min(self.top + visible + 1, n)):
+            i = self.rows[r]
+            y = (r - self.top) * ROW_HEIGHT
+            if i in self.selected:
+                c.create_rectangle(0, y, width, y + ROW_HEIGHT, fill='#cce4f7', outline='')
+            x = 0
+            for value, (_, _, w) in zip(self.index.values[i], COLUMNS):
+                c.create_text(x + 4, y + ROW_HEIGHT // 2, text=value, anchor='w')
+                x += w
+        if n:
+            self.scrollbar.set(self.top / n, min((self.top + visible) / n, 1.0))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    # ---------- mouse and keyboard ----------
+    def _row_at(self, y):
+        r = self.top + int(y // ROW_HEIGHT)
+        return r if 0 <= r < len(self.rows) else None
+
+    def _on_click(self, event):
+        self.canvas.focus_set()
+        r = self._row_at(event.y)
+        if r is None:
+            return
+        self._select(r, ctrl=event.state & 0x4, shift=event.state & 0x1)
+
+    def _select(self, r, ctrl=False, shift=False):
+        i = self.rows[r]
+        if shift and self.anchor in self.rows:
+            a = self.rows.index(self.anchor)
+            lo, hi = sorted((a, r))
+            if not ctrl:
+                self.selected.clear()
+            self.selected.update(self.rows[lo:hi + 1])
+        elif ctrl:
+            self.selected.symmetric_difference_update((i,))
+            self.anchor = i
+        else:
+            self.selected = {i}
+            self.anchor = i
+        self.cursor = i
+        self.see(r)
+
+    def _move(self, step, event):
+        if not self.rows:
+            return
+        r = self.rows.index(self.cursor) + step if self.cursor in self.rows else 0
+        r = max(0, min(r, len(self.rows) - 1))
+        if event.state & 0x1:
+            self._select(r, shift=True)
+        else:
+            self._select(r)
+
+    def _on_double_click(self, event):
+        r = self._row_at(event.y)
+        if r is not None:
+            self._activate(self.rows[r])
+
+    def _activate(self, i):
+        if i is not None and self.on_activate is not None:
+            self.on_activate(i)
@@ -0,0 +1,48 @@
+# Uniform access to tests stored in text exports or binary caches
+import os
+from datetime import datetime
+from export_index import iter_indexed_tests
+# binary_cache needs NumPy, so it is imported where used: listing the tests of a text
+# export (and launching the GUI) does not load it
+
+DATE_FORMATS = ('%d.%m.%Y %H:%M:%S', '%d/%m/%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%d.%m.%Y %H:%M', '%d.%m.%Y')
+
+
+def iter_export_tests(filepath):
+    from binary_cache import is_cache_file, load_cached_tests
+    if is_cache_file(filepath):
+        yield from load_cached_tests(filepath)
+    else:
+        yield from iter_indexed_tests(filepath)
+
+
+def test_identity(test):
+    """Hashable key that identifies one test of one file."""
+    return (os.path.abspath(test['path']), test['uid'], test.get('start', test.get('offset')))
+
+
+def detect_test_type(tipo):
+    """Returns 0 for VVOR, 1 for VORS, or None for unsupported test types."""
+    tipo_lower = tipo.lower()
+    if 'vvor' in tipo_lower or 'rvvo' in tipo_lower:
+        return 0
+    if 'vors' in tipo_lower or 'srvo' in tipo_lower:
+        return 1
+    return None
+
+
+def test_type_name(tipo):
+    """'VVOR' or 'VORS' for a <TestType> header, None if unsupported."""
+    s = detect_test_type(tipo or '')
+    return None if s is None else ('VORS' if s else 'VVOR')
+
+
+def parse_start(fecha):
+    """StartDateTime of an export as ISO 'YYYY-MM-DD HH:MM:SS' (sortable), or None."""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(fecha.strip(), fmt).strftime('%Y-%m-%d %H:%M:%S')
+        except (ValueError, AttributeError):
+            continue
+    return None
+
@@ -0,0 +1,115 @@
+# Compact per-test record: header fields, byte offsets and channels decoded on demand
+from profiling import stage
+
+# Column of each channel in the 9-column rows, and the dtype it is kept in: velocities
+# only need float32 (about 7 significant digits), the 1e-7 s time stamps need float64
+CHANNELS = {'t': (0, 'float64'), 'h': (1, 'float32'), 'e': (2, 'float32')}
+TICKS_PER_SECOND = 10000000
+
+FIELDS = (
+    'uid', 'guid', 'tipo', 'fecha', 'list_sep', 'dec_sep', 'path',
+    'start', 'header_end', 'data_start', 'end',  # text exports: byte offsets
+    'cached', 'offset', 'rows', 'rejected',  # binary caches: sample block
+)
+
+
+class TestRecord:
+    """
+    One test of an export or binary cache. Holds only header fields and where the
+    samples are, in slots rather than a dict, and reads like the test dicts it
+    replaces (record['uid'], record.get('guid')); fields a test does not have are
+    missing, not None. channels() decodes the requested channels on first use and
+    keeps them (attach() those decoded elsewhere) until release(); they are never
+    pickled, so records sent to worker processes stay small.
+    """
+
+    __slots__ = FIELDS + ('_channels',)
+
+    def __init__(self, **fields):
+        for key, value in fields.items():
+            setattr(self, key, value)
+        self._channels = None
+
+    # ---------- dict-style access ----------
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key not in FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in FIELDS and hasattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in FIELDS else default
+
+    def keys(self):
+        return [key for key in FIELDS if hasattr(self, key)]
+
+    def __repr__(self):
+        return f"TestRecord({', '.join(f'{k}={self[k]!r}' for k in self.keys())})"
+
+    def __getstate__(self):
+        return {key: self[key] for key in self.keys()}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    # ---------- samples ----------
+    def channels(self, names='teh', keep=True):
+        """
+        Arrays of the channels `names` ('t': time in seconds from the first sample,
+        'e': eye velocity, 'h': head velocity), in that order. Channels not decoded
+        yet are read together, only their columns; with keep=False they are not
+        stored on the record (one-off batch or report use).
+        """
+        cache = self._channels or {}
+        missing = [name for name in dict.fromkeys(names) if name not in cache]
+        if missing:
+            decoded = self._decode(missing)
+            if keep:
+                self._channels = cache = dict(cache, **decoded)
+            else:
+                cache = dict(cache, **decoded)
+        return tuple(cache[name] for name in names)
+
+    def attach(self, **arrays):
+        """Keeps channels decoded with keep=False (e.g. on a worker) until release()."""
+        self._channels = dict(self._channels or {}, **arrays)
+
+    def release(self):
+        """Drops the decoded channels; the next channels() call reads them again."""
+        self._channels = None
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self._channels or {}).values())
+
+    def _decode(self, names):
+        import numpy as np
+        from block_decoder import decode_numeric_block
+        cols = sorted(CHANNELS[name][0] for name in names)
+        with stage('parse.decode', channels=len(names)) as timing:
+            if self.get('cached'):
+                from binary_cache import read_cached_data
+                block = read_cached_data(self).T  # (9, rows), one contiguous run per channel
+                columns = {col: block[col] for col in cols}
+            else:
+                from export_parser import read_test_data
+                values, self.rejected = decode_numeric_block(read_test_data(self), self.list_sep, self.dec_sep,
+                                                             usecols=cols)
+                columns = {col: values[:, i] for i, col in enumerate(cols)}
+            decoded = {}
+            for name in names:
+                col, dtype = CHANNELS[name]
+                x = columns[col]
+                if name == 't' and len(x):
+                    x = (x - x[0]) / TICKS_PER_SECOND
+                decoded[name] = np.asarray(x, dtype=dtype)  # a copy: neither the text rows nor the map are kept
+            timing.set(rows=len(x))
+        return decoded
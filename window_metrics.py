@@ -0,0 +1,266 @@
+# Incremental metrics for interactive window selection
+import numpy as np
+from scipy.signal import find_peaks, peak_prominences
+from analysis_calculations import half_cycle_saccades, spectral_metrics
+from cycles import cycle_stats, half_cycle_table, select_cycles, take
+from desaccade import desaccade, desaccade_kernel
+from profiling import stage
+from regression import fit_from_sums, fit_metrics, side_masks
+
+Fs = 250  # Hz
+SIDE_BLOCK = 64  # side samples per stored prefix sum; queries sum the rest directly
+SIDE_SUMS = ('x', 'y', 'ay', 'xx', 'xy', 'yy')  # head, eye, |eye| and products of one side
+
+
+def _prefix(x):
+    return np.concatenate(([0.0], np.cumsum(x)))
+
+
+def _float64(x):
+    """x itself when already float64, else a float64 copy (exact for float32)."""
+    return np.asarray(x, dtype=np.float64)
+
+
+def _side_terms(x, y):
+    """The SIDE_SUMS terms of head samples x and desaccaded eye samples y, (6, len)."""
+    return np.stack((x, y, np.abs(y), x * x, x * y, y * y))
+
+
+class WindowMetrics:
+    """
+    Precomputes cumulative statistics of one recording once, so that the metrics of
+    any [tmin, tmax] window come from prefix-sum and binary-search queries:
+    - AUC gains and regression fits (slope, r², CI) from per-side prefix sums, with the few
+      desaccaded samples at the window edges recomputed exactly
+    - peak head velocity from the peaks of the whole recording, re-checking only
+      the peaks whose prominence bases fall outside the window
+    - PR scores from the per-half-cycle saccades, computing only the half cycle
+      cut by the window start
+    - the half-cycle table (cycles.half_cycle_table) of the whole recording, of
+      which a window keeps the half cycles lying entirely inside it
+    Only the spectra are recomputed. Results match calculate_all_metrics on the
+    same window up to floating-point summation order.
+    e and h may be float32 (TestRecord channels): they are kept as given and every
+    computation upcasts them to float64, the precomputation once, queries per window.
+    What is kept per recording stays small, as every open analysis window holds one:
+    the desaccaded eye in the dtype of e (shared with the full-window metrics), the
+    sample indices of each side, and prefix sums over those samples stored every
+    SIDE_BLOCK of them only.
+    """
+
+    def __init__(self, t, e, h, s):
+        self.t, self.e, self.h, self.s = t, e, h, s
+        self.n = len(t)
+        self.kernel = desaccade_kernel(s)
+        with stage('window.precompute', n=self.n):
+            e64, h64 = _float64(e), _float64(h)
+            # Rounded to the dtype of e (float32 for TestRecord channels) once, so the
+            # sums below and the edge corrections of queries see the same values
+            self.desac = desaccade(e64, s).astype(np.result_type(e, np.float32))
+            self.desac.setflags(write=False)  # handed out as the full-window desac_e
+            d64 = _float64(self.desac)
+            self._prepare_sides(h64, d64)
+            self._prepare_head_peaks(h64)
+            self._prepare_half_cycles(e64, h64, d64)
+
+    # ---------- precomputation ----------
+    def _prepare_sides(self, h, d):
+        # Per side: its sample indices, and the SIDE_SUMS of its first k * SIDE_BLOCK
+        # samples in column k
+        self.sides = {}
+        for side, mask in (('L', h > 0), ('R', h < 0)):
+            idx = np.flatnonzero(mask)
+            m = len(idx) // SIDE_BLOCK * SIDE_BLOCK
+            blocks = _side_terms(h[idx[:m]], d[idx[:m]]).reshape(len(SIDE_SUMS), -1, SIDE_BLOCK).sum(axis=2)
+            self.sides[side] = {
+                'idx': idx.astype(np.int32) if self.n < 2 ** 31 else idx,
+                'sums': np.concatenate((np.zeros((len(SIDE_SUMS), 1)), np.cumsum(blocks, axis=1)), axis=1),
+            }
+
+    def _prepare_head_peaks(self, h):
+        peaks, signs, props = [], [], {}
+        for sign in (1, -1):
+            p, pr = find_peaks(sign * h, height=30, prominence=10, plateau_size=1)
+            peaks.append(p)
+            signs.append(np.full(len(p), sign))
+            for key in ('left_edges', 'right_edges', 'left_bases', 'right_bases'):
+                props.setdefault(key, []).append(pr[key])
+        order = np.argsort(np.concatenate(peaks), kind='stable')
+        self.hp_idx = np.concatenate(peaks)[order]
+        self.hp_sign = np.concatenate(signs)[order]
+        for key, parts in props.items():
+            setattr(self, 'hp_' + key, np.concatenate(parts)[order])
+        values = np.abs(h[self.hp_idx])
+        self.hp_sum = _prefix(values)
+        self.hp_sumsq = _prefix(values ** 2)
+
+    def _prepare_half_cycles(self, e, h, d):
+        segments = half_cycle_saccades(e, h)
+        starts, ends, left, _, first_peak = segments
+        self.cycles = half_cycle_table(self.t, h, d, segments)
+        self.hc_cros = np.flatnonzero(np.diff(h > 0)) + 1
+        self.hc_starts, self.hc_ends, self.hc_left = starts, ends, left
+        self.hc_peak = first_peak
+
+    # ---------- queries ----------
+    def bounds(self, tmin, tmax):
+        """Sample range [lo, hi) of the window t >= tmin & t <= tmax."""
+        return np.searchsorted(self.t, tmin, 'left'), np.searchsorted(self.t, tmax, 'right')
+
+    def _window_desac(self, lo, hi):
+        """Desaccaded eye of the window exactly as if it was filtered on its own."""
+        m, k = hi - lo, self.kernel
+        if m < k:
+            return np.array(self.e[lo:hi], dtype=self.desac.dtype), np.arange(lo, hi)
+        if lo == 0 and hi == self.n:
+            return self.desac, np.arange(0)  # no edge to redo: shared, not copied
+        ker = np.ones(k) / k
+        a, b = k // 2, (k - 1) // 2
+        w = self.desac[lo:hi].copy()
+        edges = []
+        if lo > 0:
+            w[:a] = np.convolve(self.e[lo:lo + min(m, 2 * k)], ker, mode='same')[:a]
+            edges.append(np.arange(lo, lo + a))
+        if hi < self.n:
+            piece = self.e[max(lo, hi - 2 * k):hi]
+            w[m - b:] = np.convolve(piece, ker, mode='same')[len(piece) - b:]
+            edges.append(np.arange(hi - b, hi))
+        return w, np.concatenate(edges) if edges else np.arange(0)
+
+    def _side_prefix(self, sd, i):
+        """SIDE_SUMS of the first i samples of a side: a stored block, plus at most SIDE_BLOCK - 1 samples."""
+        k = i // SIDE_BLOCK
+        idx = sd['idx'][k * SIDE_BLOCK:i]
+        return sd['sums'][:, k] + _side_terms(_float64(self.h[idx]), _float64(self.desac[idx])).sum(axis=1)
+
+    def _side_sums(self, side, lo, hi, w, edges):
+        """Sample count, sums and first/last samples of one side inside the window."""
+        sd = self.sides[side]
+        i0, i1 = np.searchsorted(sd['idx'], [lo, hi])
+        sums = dict(zip(SIDE_SUMS, self._side_prefix(sd, i1) - self._side_prefix(sd, i0)))
+        # Edge samples whose desaccaded value differs from the whole-recording filter
+        mask = self.h[edges] > 0 if side == 'L' else self.h[edges] < 0
+        edges = edges[mask]
+        dw = _float64(w[edges - lo])
+        dd = _float64(self.desac[edges])
+        sums['y'] += np.sum(dw - dd)
+        sums['ay'] += np.sum(np.abs(dw) - np.abs(dd))
+        sums['xy'] += np.sum(_float64(self.h[edges]) * (dw - dd))
+        sums['yy'] += np.sum(dw * dw - dd * dd)
+        first = last = None
+        if i1 > i0:
+            first, last = sd['idx'][i0], sd['idx'][i1 - 1]
+        return i1 - i0, sums, first, last
+
+    def _auc_and_fit(self, side, lo, hi, w, edges):
+        count, S, first, last = self._side_sums(side, lo, hi, w, edges)
+        gain = np.nan
+        if count > 1:
+            h0, h1 = float(self.h[first]), float(self.h[last])
+            e0, e1 = float(w[first - lo]), float(w[last - lo])
+            head_area = (S['x'] - (h0 + h1) / 2) / Fs
+            if np.abs(head_area) > 0:
+                if side == 'L':
+                    gain = (S['y'] - (e0 + e1) / 2) / (S['x'] - (h0 + h1) / 2)
+                else:
+                    gain = (S['ay'] - (abs(e0) + abs(e1)) / 2) / -(S['x'] - (h0 + h1) / 2)
+        return gain, fit_from_sums(count, S['x'], S['y'], S['xx'], S['xy'], S['yy'])
+
+    def _peak_head(self, lo, hi):
+        if hi - lo <= 3:
+            return np.nan, np.nan
+        r0, r1 = np.searchsorted(self.hp_idx, [lo, hi])
+        count = r1 - r0
+        total = self.hp_sum[r1] - self.hp_sum[r0]
+        total_sq = self.hp_sumsq[r1] - self.hp_sumsq[r0]
+        # Peaks whose bases reach outside the window may lose prominence or stop being peaks
+        sel = slice(r0, r1)
+        cut = np.flatnonzero((self.hp_left_bases[sel] < lo) | (self.hp_right_bases[sel] > hi - 1)) + r0
+        for j in cut:
+            p, sign = self.hp_idx[j], self.hp_sign[j]
+            keep = self.hp_left_edges[j] > lo and self.hp_right_edges[j] < hi - 1
+            if keep:
+                keep = peak_prominences(sign * _float64(self.h[lo:hi]), [p - lo])[0][0] >= 10
+            if not keep:
+                v = abs(float(self.h[p]))
+                count -= 1
+                total -= v
+                total_sq -= v * v
+        if count <= 1:
+            return np.nan, np.nan
+        mean = total / count
+        return mean, np.sqrt(max(total_sq / count - mean ** 2, 0.0))
+
+    def _saccades(self, lo, hi):
+        lPR = np.nan
+        rPR = np.nan
+        if self.s == 1 or hi - lo < 4:
+            return lPR, rPR, []
+        t, h = self.t, self.h
+        latency_L, latency_R, positions = [], [], []
+        # Crossings of the window: the global ones inside it, plus its first sample
+        # when the wrap-around of np.roll sees a sign change there
+        c0, c1 = np.searchsorted(self.hc_cros, [lo + 1, hi])
+        if (h[lo] > 0) != (h[hi - 1] > 0) and c1 > c0:
+            end = self.hc_cros[c0]
+            e_int = _float64(self.e[lo:end])
+            if len(e_int) >= 4 and np.max(np.abs(h[lo:end])) >= 15:
+                peaks, _ = find_peaks(np.abs(e_int), height=180, prominence=130, width=(None, 20))
+                if len(peaks) > 0:
+                    positions.append(t[lo + peaks[0]])
+                    latency = t[lo + peaks[0]] - t[lo]
+                    (latency_L if h[lo] > 0 else latency_R).append(latency)
+        # Whole half cycles inside the window reuse the precomputed saccades
+        j0, j1 = np.searchsorted(self.hc_starts, lo + 1), np.searchsorted(self.hc_ends, hi)
+        j1 = max(j0, min(j1, len(self.hc_starts)))
+        peak = self.hc_peak[j0:j1]
+        found = peak >= 0
+        peak_idx = peak[found]
+        starts = self.hc_starts[j0:j1][found]
+        left = self.hc_left[j0:j1][found]
+        latency = t[peak_idx] - t[starts]
+        positions.extend(t[peak_idx])
+        latency_L = np.concatenate((latency_L, latency[left]))
+        latency_R = np.concatenate((latency_R, latency[~left]))
+        if len(latency_L) > 3 and np.mean(latency_L) != 0:
+            lPR = round(np.std(latency_L) / np.mean(latency_L) * 100)
+        if len(latency_R) > 3 and np.mean(latency_R) != 0:
+            rPR = round(np.std(latency_R) / np.mean(latency_R) * 100)
+        lPR = min(lPR, 100) if not np.isnan(lPR) else lPR
+        rPR = min(rPR, 100) if not np.isnan(rPR) else rPR
+        return lPR, rPR, positions
+
+    def metrics(self, tmin, tmax):
+        """Same dictionary as calculate_all_metrics for the window t >= tmin & t <= tmax."""
+        lo, hi = self.bounds(tmin, tmax)
+        with stage('window.desaccade', n=hi - lo):
+            w, edges = self._window_desac(lo, hi)
+        with stage('window.gains', n=hi - lo):
+            gain_auc_L, fit_L = self._auc_and_fit('L', lo, hi, w, edges)
+            gain_auc_R, fit_R = self._auc_and_fit('R', lo, hi, w, edges)
+        with stage('window.head_peaks', n=hi - lo):
+            mean_peak_head, std_peak_head = self._peak_head(lo, hi)
+        with stage('window.saccades', n=hi - lo):
+            lPR, rPR, saccades = self._saccades(lo, hi)
+
+        h_win, e_win = _float64(self.h[lo:hi]), _float64(self.e[lo:hi])
+        pos_mask, neg_mask = side_masks(h_win)
+        metrics = {
+            "desac_e": w,
+            "gain_auc_L": gain_auc_L,
+            "gain_auc_R": gain_auc_R,
+            "pos_mask": pos_mask, "neg_mask": neg_mask,
+            "lPR": lPR, "rPR": rPR,
+            "saccades": saccades,
+            "mean_peak_head": mean_peak_head,
+            "std_peak_head": std_peak_head,
+        }
+        metrics.update(fit_metrics(fit_L, fit_R))
+        with stage('window.cycles', n=hi - lo):
+            rows = select_cycles(self.cycles, lo, hi)
+            metrics["cycles"] = take(self.cycles, rows)
+            metrics.update(cycle_stats(self.cycles, rows))
+        with stage('window.spectral', n=hi - lo):
+            metrics.update(spectral_metrics(h_win, e_win, h_win[pos_mask], w[pos_mask],
+                                            h_win[neg_mask], w[neg_mask]))
+        return metrics